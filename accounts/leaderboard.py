@@ -0,0 +1,159 @@
+"""XP leaderboards with O(log n) rank lookups.
+
+Each scope (global, or one per course subject) keeps a Fenwick tree over
+XP values in XPRankNode: node ``i`` stores how many students have an XP in
+a fixed range ending at ``i``. "How many students have XP <= x" sums at
+most log2(TREE_SIZE) nodes, and moving a student from one XP value to
+another updates as many. Both are a single indexed query, independent of
+the number of students. Top-N lists come straight from the (role, -xp) and
+(subject, -xp) indexes.
+"""
+import heapq
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, F
+
+from .models import SubjectXP, User, XPRankNode
+
+GLOBAL = ""
+TREE_SIZE = 1 << 20  # XP values above TREE_SIZE - 1 share the top slot
+
+
+def subject_scope(subject):
+    return (subject or "").strip().casefold()[:100]
+
+
+def _slot(xp):
+    return min(max(int(xp), 0), TREE_SIZE - 1) + 1  # Fenwick trees are 1-based
+
+
+def _update_nodes(xp):
+    i = _slot(xp)
+    while i <= TREE_SIZE:
+        yield i
+        i += i & -i
+
+
+def _prefix_nodes(xp):
+    i = _slot(xp)
+    while i > 0:
+        yield i
+        i -= i & -i
+
+
+def _apply(scope, deltas):
+    """Add ``deltas`` ({node: delta}) to one tree: one insert plus one UPDATE per distinct delta."""
+    deltas = {node: d for node, d in deltas.items() if d}
+    if not deltas:
+        return
+    XPRankNode.objects.bulk_create(
+        [XPRankNode(scope=scope, node=node) for node in deltas], ignore_conflicts=True
+    )
+    by_delta = defaultdict(list)
+    for node, d in deltas.items():
+        by_delta[d].append(node)
+    for d, nodes in by_delta.items():
+        XPRankNode.objects.filter(scope=scope, node__in=nodes).update(count=F("count") + d)
+
+
+def track(scope, old_xp=None, new_xp=None):
+    """Record a student entering (old None), leaving (new None) or moving within a leaderboard."""
+    deltas = defaultdict(int)
+    if old_xp is not None:
+        for node in _update_nodes(old_xp):
+            deltas[node] -= 1
+    if new_xp is not None:
+        for node in _update_nodes(new_xp):
+            deltas[node] += 1
+    _apply(scope, deltas)
+
+
+def award_xp(user, amount, subject=None):
+    """Give ``user`` XP (atomically) and keep the global and subject leaderboards in sync."""
+    with db_transaction.atomic():
+        User.objects.filter(pk=user.pk).update(xp=F("xp") + amount)
+        new_xp = User.objects.filter(pk=user.pk).values_list("xp", flat=True).get()
+        user.xp = new_xp
+        if user.role != "student":
+            return new_xp
+        track(GLOBAL, new_xp - amount, new_xp)
+
+        scope = subject_scope(subject)
+        if scope:
+            row, created = SubjectXP.objects.get_or_create(user=user, subject=scope)
+            SubjectXP.objects.filter(pk=row.pk).update(xp=F("xp") + amount)
+            track(scope, None if created else row.xp, row.xp + amount)
+    return new_xp
+
+
+def rank_of(xp, scope=GLOBAL):
+    """1-based competition rank of a given XP value (ties share a rank)."""
+    prefix = list(_prefix_nodes(xp))
+    rows = dict(
+        XPRankNode.objects.filter(scope=scope, node__in=prefix + [TREE_SIZE]).values_list("node", "count")
+    )
+    total = rows.get(TREE_SIZE, 0)
+    at_or_below = sum(rows.get(node, 0) for node in prefix)
+    return 1 + total - at_or_below
+
+
+def my_rank(user, subject=None):
+    """The user's rank in a leaderboard, or None if they're not on it."""
+    if user.role != "student":
+        return None
+    scope = subject_scope(subject)
+    if not scope:
+        return rank_of(user.xp)
+    xp = SubjectXP.objects.filter(user=user, subject=scope).values_list("xp", flat=True).first()
+    return None if xp is None else rank_of(xp, scope)
+
+
+def top_students(limit=50, subject=None):
+    """[(xp, user), ...] best first."""
+    scope = subject_scope(subject)
+    if not scope:
+        return [(u.xp, u) for u in User.objects.filter(role="student").order_by("-xp", "id")[:limit]]
+    rows = SubjectXP.objects.filter(subject=scope).select_related("user").order_by("-xp", "id")[:limit]
+    return [(row.xp, row.user) for row in rows]
+
+
+def _build_tree(histogram):
+    """Fenwick nodes from {xp: count}; only nodes that end up non-zero are visited."""
+    tree = defaultdict(int)
+    for xp, n in histogram.items():
+        tree[_slot(xp)] += n
+    pending = list(tree)
+    heapq.heapify(pending)
+    while pending:
+        i = heapq.heappop(pending)
+        parent = i + (i & -i)
+        if parent <= TREE_SIZE:
+            if parent not in tree:
+                heapq.heappush(pending, parent)
+            tree[parent] += tree[i]
+    return tree
+
+
+def rebuild(scope=None):
+    """Recompute trees from User.xp / SubjectXP (all scopes when ``scope`` is None)."""
+    histograms = defaultdict(dict)
+    if scope in (None, GLOBAL):
+        histograms[GLOBAL] = dict(
+            User.objects.filter(role="student").values("xp").annotate(n=Count("id")).values_list("xp", "n")
+        )
+    subjects = SubjectXP.objects.all() if scope is None else SubjectXP.objects.filter(subject=scope)
+    if scope != GLOBAL:
+        for subject, xp, n in subjects.values("subject", "xp").annotate(n=Count("id")).values_list("subject", "xp", "n"):
+            histograms[subject][xp] = n
+
+    with db_transaction.atomic():
+        stale = XPRankNode.objects.all() if scope is None else XPRankNode.objects.filter(scope=scope)
+        stale.delete()
+        for tree_scope, histogram in histograms.items():
+            tree = _build_tree(histogram)
+            XPRankNode.objects.bulk_create(
+                [XPRankNode(scope=tree_scope, node=node, count=n) for node, n in tree.items() if n],
+                batch_size=1000,
+            )
+    return len(histograms)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the XP leaderboard rank trees from User.xp and SubjectXP (e.g. after editing XP in admin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subject", help="Only rebuild this subject's leaderboard.")
+        parser.add_argument("--global", dest="global_only", action="store_true", help="Only rebuild the global leaderboard.")
+
+    def handle(self, *args, **options):
+        scope = None
+        if options["global_only"]:
+            scope = leaderboard.GLOBAL
+        elif options["subject"]:
+            scope = leaderboard.subject_scope(options["subject"])
+        count = leaderboard.rebuild(scope)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} leaderboard(s)."))
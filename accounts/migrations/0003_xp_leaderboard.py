@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_global_leaderboard(apps, schema_editor):
+    from accounts.leaderboard import GLOBAL, _build_tree
+
+    User = apps.get_model("accounts", "User")
+    XPRankNode = apps.get_model("accounts", "XPRankNode")
+    histogram = dict(
+        User.objects.filter(role="student").values("xp").annotate(n=models.Count("id")).values_list("xp", "n")
+    )
+    XPRankNode.objects.bulk_create(
+        [XPRankNode(scope=GLOBAL, node=node, count=n) for node, n in _build_tree(histogram).items() if n],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_teacher_profile_fields'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectXP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('xp', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='XPRankNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(blank=True, max_length=100)),
+                ('node', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', '-xp'], name='user_role_xp_idx'),
+        ),
+        migrations.AddField(
+            model_name='subjectxp',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_xp', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='xpranknode',
+            unique_together={('scope', 'node')},
+        ),
+        migrations.AddIndex(
+            model_name='subjectxp',
+            index=models.Index(fields=['subject', '-xp'], name='subjectxp_subject_xp_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectxp',
+            unique_together={('user', 'subject')},
+        ),
+        migrations.RunPython(build_global_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Min, Sum
+
+
+def build_referral_tree(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    ReferralPath = apps.get_model("accounts", "ReferralPath")
+    ReferralStats = apps.get_model("accounts", "ReferralStats")
+    Transaction = apps.get_model("wallet", "Transaction")
+
+    parents = dict(User.objects.values_list("id", "referred_by_id"))
+    purchases = {
+        row["user_id"]: row
+        for row in Transaction.objects.filter(type="convert_to_z")
+        .values("user_id")
+        .annotate(first=Min("created_at"), total=Sum("amount_z"))
+    }
+    bonuses = dict(
+        Transaction.objects.filter(type="referral_bonus")
+        .values("user_id")
+        .annotate(total=Sum("amount_z"))
+        .values_list("user_id", "total")
+    )
+    stats = {
+        user_id: ReferralStats(
+            user_id=user_id,
+            bonus_z=bonuses.get(user_id) or 0,
+            first_purchase_at=purchases[user_id]["first"] if user_id in purchases else None,
+        )
+        for user_id in parents
+    }
+    paths = []
+    for user_id in parents:
+        paths.append(ReferralPath(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        node, depth, seen = user_id, 0, {user_id}
+        while parents.get(node) and parents[node] not in seen:
+            node = parents[node]
+            depth += 1
+            seen.add(node)
+            paths.append(ReferralPath(ancestor_id=node, descendant_id=user_id, depth=depth))
+            row = stats[node]
+            row.total_count += 1
+            row.direct_count += depth == 1
+            if user_id in purchases:
+                row.buyers_count += 1
+                row.purchased_z = Decimal(row.purchased_z) + Decimal(purchases[user_id]["total"] or 0)
+    ReferralStats.objects.bulk_create(stats.values(), batch_size=500)
+    ReferralPath.objects.bulk_create(paths, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_xp_leaderboard'),
+        ('wallet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='referral_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('direct_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('buyers_count', models.PositiveIntegerField(default=0)),
+                ('purchased_z', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('bonus_z', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('first_purchase_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_count'], name='referral_top_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferralPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_descendants', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_ancestors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='referral_descendant_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_referral_tree, migrations.RunPython.noop),
+    ]
@@ -26,6 +26,12 @@ class User(AbstractUser):
     xp = models.PositiveIntegerField(default=0)
     streak_days = models.PositiveIntegerField(default=0)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # leaderboard top-N (accounts.leaderboard)
+            models.Index(fields=["role", "-xp"], name="user_role_xp_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.display_name:
             self.display_name = self.username
@@ -43,3 +49,75 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.display_name} ({self.role})"
+
+
+class SubjectXP(models.Model):
+    """XP a student earned within one course subject (per-subject leaderboards)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="subject_xp")
+    subject = models.CharField(max_length=100)
+    xp = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "subject")
+        indexes = [models.Index(fields=["subject", "-xp"], name="subjectxp_subject_xp_idx")]
+
+    def __str__(self):
+        return f"{self.user} {self.subject}: {self.xp} XP"
+
+
+class XPRankNode(models.Model):
+    """One node of a Fenwick tree counting students per XP value.
+
+    ``scope`` is "" for the global leaderboard or a subject. Rank lookups and
+    XP changes touch O(log max_xp) nodes; see accounts.leaderboard.
+    """
+
+    scope = models.CharField(max_length=100, blank=True)
+    node = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("scope", "node")
+
+    def __str__(self):
+        return f"{self.scope or 'global'}[{self.node}] = {self.count}"
+
+
+class ReferralPath(models.Model):
+    """Closure table of the referral tree: ``ancestor`` invited ``descendant`` ``depth`` levels down.
+
+    Every user has a depth-0 row to itself. Rows are written once at registration
+    (accounts.referrals.add_user), so "everyone my invites brought in" is a plain
+    indexed lookup instead of a recursive query.
+    """
+
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="referral_descendants")
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="referral_ancestors")
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ("ancestor", "descendant")
+        indexes = [models.Index(fields=["descendant", "depth"], name="referral_descendant_idx")]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
+class ReferralStats(models.Model):
+    """Per-user referral aggregates, updated incrementally by accounts.referrals."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="referral_stats")
+    direct_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)  # referees at any depth
+    buyers_count = models.PositiveIntegerField(default=0)  # referees (any depth) who bought Z at least once
+    purchased_z = models.DecimalField(max_digits=18, decimal_places=2, default=0)  # Z bought by referees
+    bonus_z = models.DecimalField(max_digits=18, decimal_places=2, default=0)  # referral bonuses earned
+    # When this user first bought Z coins (the referral bonus is paid only then).
+    first_purchase_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-total_count"], name="referral_top_idx")]
+
+    def __str__(self):
+        return f"{self.user}: {self.total_count} referrals"
@@ -0,0 +1,83 @@
+"""Referral tree (closure table) and incrementally maintained referral stats.
+
+Registration inserts the new user's ReferralPath rows, copying the inviter's
+ancestor rows one level deeper. It also bumps ReferralStats for every
+ancestor in one UPDATE. Z purchases add to the ancestors' totals the same way,
+so dashboards read precomputed numbers instead of walking the tree.
+
+Re-parenting a user after registration is not supported. Deleting a user
+removes their paths but leaves ancestors' counters as they were.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ReferralPath, ReferralStats
+
+
+def add_user(user):
+    """Record a newly registered user in the referral tree."""
+    with transaction.atomic():
+        ReferralStats.objects.bulk_create([ReferralStats(user_id=user.pk)], ignore_conflicts=True)
+        paths = [ReferralPath(ancestor_id=user.pk, descendant_id=user.pk, depth=0)]
+        inviter_id = user.referred_by_id
+        if inviter_id:
+            ancestors = dict(
+                ReferralPath.objects.filter(descendant_id=inviter_id).values_list("ancestor_id", "depth")
+            )
+            ancestors.setdefault(inviter_id, 0)
+            paths += [
+                ReferralPath(ancestor_id=ancestor_id, descendant_id=user.pk, depth=depth + 1)
+                for ancestor_id, depth in ancestors.items()
+            ]
+            ReferralStats.objects.bulk_create(
+                [ReferralStats(user_id=ancestor_id) for ancestor_id in ancestors], ignore_conflicts=True
+            )
+            ReferralStats.objects.filter(user_id__in=ancestors).update(total_count=F("total_count") + 1)
+            ReferralStats.objects.filter(user_id=inviter_id).update(direct_count=F("direct_count") + 1)
+        ReferralPath.objects.bulk_create(paths, ignore_conflicts=True)
+
+
+def record_z_purchase(user, z_amount):
+    """Add a Z purchase to the buyer's ancestors; returns True if it was the buyer's first."""
+    with transaction.atomic():
+        first = bool(
+            ReferralStats.objects.filter(user_id=user.pk, first_purchase_at__isnull=True).update(
+                first_purchase_at=timezone.now()
+            )
+        )
+        changes = {"purchased_z": F("purchased_z") + z_amount}
+        if first:
+            changes["buyers_count"] = F("buyers_count") + 1
+        ReferralStats.objects.filter(
+            user_id__in=ReferralPath.objects.filter(descendant_id=user.pk, depth__gte=1).values("ancestor_id")
+        ).update(**changes)
+    return first
+
+
+def add_bonus(inviter, bonus_z):
+    ReferralStats.objects.filter(user_id=inviter.pk).update(bonus_z=F("bonus_z") + bonus_z)
+
+
+def stats_for(user):
+    return ReferralStats.objects.filter(user_id=user.pk).first() or ReferralStats(user=user)
+
+
+def top_referrers(limit=20):
+    """Users who brought in the most people, with their stats, in one query."""
+    return list(
+        ReferralStats.objects.filter(total_count__gt=0)
+        .select_related("user")
+        .order_by("-total_count", "-purchased_z")[:limit]
+    )
+
+
+def referrals_by_depth(user):
+    """``[(depth, count), ...]`` of the user's referees, depth 1 = invited directly."""
+    return list(
+        ReferralPath.objects.filter(ancestor_id=user.pk, depth__gte=1)
+        .values("depth")
+        .annotate(count=Count("descendant_id"))
+        .order_by("depth")
+        .values_list("depth", "count")
+    )
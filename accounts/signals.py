@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import leaderboard, referrals
+from .models import SubjectXP, User
+
+
+@receiver(post_save, sender=User)
+def add_student_to_leaderboard(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.role == "student":
+        leaderboard.track(leaderboard.GLOBAL, new_xp=instance.xp)
+
+
+@receiver(post_save, sender=User)
+def add_user_to_referral_tree(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        referrals.add_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_student_from_leaderboard(sender, instance, **kwargs):
+    if instance.role == "student":
+        leaderboard.track(leaderboard.GLOBAL, old_xp=instance.xp)
+
+
+@receiver(post_delete, sender=SubjectXP)
+def remove_subject_entry(sender, instance, **kwargs):
+    leaderboard.track(instance.subject, old_xp=instance.xp)
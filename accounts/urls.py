@@ -16,4 +16,6 @@ urlpatterns = [
         name="login",
     ),
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
+    path("leaderboard/", views.leaderboard_view, name="leaderboard"),
+    path("referrals/", views.referrals_view, name="referrals"),
 ]
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib import messages
@@ -6,10 +8,12 @@ from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils import timezone
 from django.urls import reverse
 from django.utils.translation import gettext as _
 from .forms import RegisterForm
 from .models import User
+from . import leaderboard, referrals
 
 
 def landing(request):
@@ -137,4 +141,40 @@ def dashboard(request):
         "teacher": "dashboard/teacher_dashboard.html",
         "ceo": "dashboard/ceo_dashboard.html",
     }.get(user.role, "dashboard/student_dashboard.html")
-    return render(request, template)
+    context = {}
+    if template == "dashboard/student_dashboard.html":
+        from courses.recommendations import recommended_for_student
+        context["recommended_courses"] = recommended_for_student(user)
+        context["xp_rank"] = leaderboard.my_rank(user)
+        context["referral_stats"] = referrals.stats_for(user)
+    elif template == "dashboard/teacher_dashboard.html":
+        from wallet.operations import balance_with_pending
+        from wallet.rollups import earnings_report, parse_day
+        context["available_z"], context["pending_z"] = balance_with_pending(user.wallet)
+        if not user.teacher_enrolled:
+            from wallet.site_settings import teacher_enrollment_fee
+            context["enrollment_fee"] = teacher_enrollment_fee()
+        today = timezone.localdate()
+        end = parse_day(request.GET.get("to"), today)
+        start = parse_day(request.GET.get("from"), end - timedelta(days=29))
+        context.update(earnings=earnings_report(user, start, end), earnings_from=start, earnings_to=end)
+    return render(request, template, context)
+
+
+@login_required
+def leaderboard_view(request):
+    subject = (request.GET.get("subject") or "").strip()
+    return render(request, "accounts/leaderboard.html", {
+        "subject": subject,
+        "top": leaderboard.top_students(50, subject=subject),
+        "my_rank": leaderboard.my_rank(request.user, subject=subject),
+    })
+
+
+@login_required
+def referrals_view(request):
+    return render(request, "accounts/referrals.html", {
+        "stats": referrals.stats_for(request.user),
+        "by_depth": referrals.referrals_by_depth(request.user),
+        "top": referrals.top_referrers(20),
+    })
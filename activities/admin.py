@@ -1,10 +1,87 @@
-from django.contrib import admin
-from .models import Activity, ActivityParticipant
+from django.contrib import admin, messages
+from .models import Activity, ActivityParticipant, ActivityWaitlistEntry, Match
+from . import brackets, payouts, services
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
-    list_display = ("title", "activity_type", "created_by", "start_at", "entry_fee_z", "prize_pool_z")
+    list_display = (
+        "title", "activity_type", "created_by", "start_at", "entry_fee_z", "prize_pool_z",
+        "seats_taken", "max_participants",
+    )
+    readonly_fields = Activity.COUNTER_FIELDS
+    actions = ["start_bracket", "advance_round", "pay_winner_takes_all", "pay_top_three", "refund_entry_fees"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "max_participants" in form.changed_data and services.is_open(obj):
+            # Raising the cap frees seats for the waitlist (only before the event starts).
+            promoted = services.promote_waitlist(obj)
+            if promoted:
+                self.message_user(request, f"{promoted} waitlisted user(s) joined.")
+
+    def _pay_out(self, request, queryset, rule):
+        for activity in queryset:
+            try:
+                paid = payouts.pay_out(activity, rule)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+                continue
+            total = sum(amount for _, amount in paid)
+            self.message_user(
+                request, f"{activity.title}: paid {total} Z to {len(paid)} participant(s).", messages.SUCCESS
+            )
+
+    @admin.action(description="Start bracket (seed by XP, pair round 1)")
+    def start_bracket(self, request, queryset):
+        for activity in queryset:
+            try:
+                created = brackets.start_bracket(activity)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+                continue
+            self.message_user(request, f"{activity.title}: round 1 has {created} match(es).", messages.SUCCESS)
+
+    @admin.action(description="Close current round and pair the next")
+    def advance_round(self, request, queryset):
+        for activity in queryset:
+            try:
+                created = brackets.advance_round(activity)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+                continue
+            if created:
+                text = f"{activity.title}: round {activity.current_round} has {created} match(es)."
+            else:
+                text = f"{activity.title}: bracket finished, final ranks are set."
+            self.message_user(request, text, messages.SUCCESS)
+
+    @admin.action(description="Pay out prizes: winner takes all (uses participant ranks)")
+    def pay_winner_takes_all(self, request, queryset):
+        self._pay_out(request, queryset, payouts.WINNER_TAKES_ALL)
+
+    @admin.action(description="Pay out prizes: top 3 get 50/30/20%% (uses participant ranks)")
+    def pay_top_three(self, request, queryset):
+        self._pay_out(request, queryset, payouts.TOP_N)
+
+    @admin.action(description="Cancelled: refund entry fees to all participants")
+    def refund_entry_fees(self, request, queryset):
+        self._pay_out(request, queryset, payouts.REFUND)
 
 @admin.register(ActivityParticipant)
 class ActivityParticipantAdmin(admin.ModelAdmin):
-    list_display = ("activity", "user", "joined_at")
+    list_display = ("activity", "user", "joined_at", "seed_xp", "points", "losses", "rank", "prize_z")
+    list_editable = ("rank",)
+    list_filter = ("activity",)
+
+@admin.register(ActivityWaitlistEntry)
+class ActivityWaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("activity", "user", "created_at")
+    list_filter = ("activity",)
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_display = ("activity", "round", "table", "bracket", "player_a", "player_b", "result")
+    list_editable = ("result",)
+    list_filter = ("activity", "round", "bracket")
+    raw_id_fields = ("player_a", "player_b")
+    list_select_related = ("player_a", "player_b", "activity")
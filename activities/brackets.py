@@ -0,0 +1,345 @@
+"""Tournament brackets: single elimination, double elimination and Swiss pairing.
+
+``start_bracket`` seeds the participants by ``User.xp`` and pairs round 1. The
+seeding is an XP snapshot copied into ``seed_xp`` by one UPDATE; ``SEED_ORDER``
+breaks ties by join time.
+``record_results`` stores match results. ``advance_round`` folds the finished
+round into the standings on ActivityParticipant (points, losses, byes), using
+one set-based UPDATE per kind of change, then bulk-creates the next round's
+Match rows. When the bracket is decided it writes the final ``rank`` of every
+participant, which is what activities.payouts reads.
+
+Elimination rounds pair players with the same number of losses: the winners
+bracket (no loss) and the losers bracket (one loss). Within each, the strongest
+seed plays the weakest. A player is out after one loss in single elimination and
+two in double elimination. When two players are left, they meet in the grand
+final, which is replayed if the unbeaten player loses it. Round 1 gives byes to
+the top seeds so that the winners bracket is a power of two from round 2 on.
+
+Swiss rounds pair players in standing order, each with the next player they
+have not met yet. Past pairings live in a set and unpaired players in a linked
+list, so a round costs O(players x rounds) instead of a quadratic search. The
+rare leftovers at the bottom are fixed by swapping with a recent pair. A rematch
+is only accepted when that fails too, which can happen once the number of rounds
+approaches the number of players.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Activity, ActivityParticipant, Match
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+SWAP_WINDOW = 50
+WIN = 2  # standings are kept in half-points
+DRAW = 1
+SEED_ORDER = ("-seed_xp", "joined_at", "id")
+
+
+class BracketError(ValueError):
+    pass
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start : start + BATCH_SIZE]
+
+
+def _bump(activity, user_ids, **amounts):
+    """Add ``amounts`` to the given participants' counters, one UPDATE per chunk."""
+    changes = {name: F(name) + amount for name, amount in amounts.items()}
+    for chunk in _chunks(user_ids):
+        ActivityParticipant.objects.filter(activity=activity, user_id__in=chunk).update(**changes)
+
+
+def _key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _lives(activity):
+    return 2 if activity.bracket_format == "double" else 1
+
+
+def _fold(players):
+    """Strongest against weakest: ``[(1st, last), (2nd, second-to-last), ...]``."""
+    return [(players[i], players[-1 - i]) for i in range(len(players) // 2)]
+
+
+def _matches(activity, round_no, pairings):
+    """Match rows for ``[(bracket, player_a, player_b or None)]``; byes are decided at once."""
+    return [
+        Match(
+            activity=activity,
+            round=round_no,
+            table=table,
+            bracket=bracket,
+            player_a_id=a,
+            player_b_id=b,
+            result="" if b else "a",
+        )
+        for table, (bracket, a, b) in enumerate(pairings, start=1)
+    ]
+
+
+def start_bracket(activity):
+    """Seed the participants by XP and create round 1; returns the number of matches."""
+    if activity.activity_type != "tournament":
+        raise BracketError(f"{activity.title} is not a tournament.")
+    if not activity.bracket_format:
+        raise BracketError(f"Choose a bracket format for {activity.title} first.")
+    participants = ActivityParticipant.objects.filter(activity=activity)
+    if participants.count() < 2:
+        raise BracketError(f"{activity.title} needs at least two participants.")
+
+    with transaction.atomic():
+        if not Activity.objects.filter(pk=activity.pk, current_round=0).update(current_round=1):
+            raise BracketError(f"{activity.title} has already started.")
+        participants.update(seed_xp=Subquery(User.objects.filter(pk=OuterRef("user_id")).values("xp")[:1]))
+        players = list(participants.order_by(*SEED_ORDER).values_list("user_id", flat=True))
+        if activity.bracket_format == "swiss":
+            pairings = _swiss_round(players, {user_id: 0 for user_id in players}, set())
+            if not activity.rounds_planned:
+                activity.rounds_planned = math.ceil(math.log2(len(players)))
+                Activity.objects.filter(pk=activity.pk).update(rounds_planned=activity.rounds_planned)
+        else:
+            size = 1 << (len(players) - 1).bit_length()
+            byes = players[: size - len(players)]
+            pairings = [("w", user_id, None) for user_id in byes]
+            pairings += [("w", a, b) for a, b in _fold(players[len(byes) :])]
+        Match.objects.bulk_create(_matches(activity, 1, pairings), batch_size=BATCH_SIZE)
+    activity.current_round = 1
+    return len(pairings)
+
+
+def record_results(activity, results):
+    """Store ``{match_id: "a" | "b" | "d"}`` for the current round; returns matches updated.
+
+    Already decided matches are left alone. Draws are only allowed in Swiss.
+    """
+    allowed = {"a", "b", "d"} if activity.bracket_format == "swiss" else {"a", "b"}
+    by_result = defaultdict(list)
+    for match_id, result in results.items():
+        if result not in allowed:
+            raise BracketError(f"Invalid result {result!r} for match {match_id}.")
+        by_result[result].append(match_id)
+    updated = 0
+    for result, ids in by_result.items():
+        for chunk in _chunks(ids):
+            updated += Match.objects.filter(
+                activity=activity, round=activity.current_round, pk__in=chunk, result=""
+            ).update(result=result)
+    return updated
+
+
+def advance_round(activity):
+    """Close the current round and pair the next one.
+
+    Returns the number of new matches; 0 means the bracket is finished and the
+    final ranks are written. Raises BracketError while results are missing.
+    """
+    round_no = activity.current_round
+    if not round_no:
+        raise BracketError(f"{activity.title} has not started.")
+    if activity.bracket_finished_at:
+        raise BracketError(f"{activity.title} is already finished.")
+    matches = list(
+        Match.objects.filter(activity=activity, round=round_no).values_list("player_a_id", "player_b_id", "result")
+    )
+    pending = sum(1 for *_, result in matches if not result)
+    if pending:
+        raise BracketError(f"{pending} match(es) of round {round_no} have no result yet.")
+    if activity.bracket_format != "swiss" and any(result == "d" for *_, result in matches):
+        raise BracketError("Elimination matches cannot end in a draw.")
+
+    with transaction.atomic():
+        claimed = Activity.objects.filter(
+            pk=activity.pk, current_round=round_no, bracket_finished_at__isnull=True
+        ).update(current_round=round_no + 1)
+        if not claimed:
+            raise BracketError(f"Round {round_no} of {activity.title} was already closed.")
+        _apply_results(activity, round_no, matches)
+        if activity.bracket_format == "swiss":
+            pairings = _next_swiss_round(activity, round_no)
+        else:
+            pairings = _next_elimination_round(activity)
+        if pairings:
+            Match.objects.bulk_create(_matches(activity, round_no + 1, pairings), batch_size=BATCH_SIZE)
+            activity.current_round = round_no + 1
+        else:
+            activity.bracket_finished_at = timezone.now()
+            Activity.objects.filter(pk=activity.pk).update(
+                current_round=round_no, bracket_finished_at=activity.bracket_finished_at
+            )
+    return len(pairings)
+
+
+def _apply_results(activity, round_no, matches):
+    winners, losers, draws, byes = [], [], [], []
+    for a, b, result in matches:
+        if b is None:
+            byes.append(a)
+        elif result == "d":
+            draws += [a, b]
+        else:
+            winner, loser = (a, b) if result == "a" else (b, a)
+            winners.append(winner)
+            losers.append(loser)
+    _bump(activity, winners + byes, points=WIN)
+    _bump(activity, draws, points=DRAW)
+    _bump(activity, losers, losses=1)
+    _bump(activity, byes, byes=1)
+    if activity.bracket_format != "swiss":
+        ActivityParticipant.objects.filter(
+            activity=activity, eliminated_round__isnull=True, losses__gte=_lives(activity)
+        ).update(eliminated_round=round_no)
+
+
+def _next_elimination_round(activity):
+    alive = list(
+        ActivityParticipant.objects.filter(activity=activity, eliminated_round__isnull=True)
+        .order_by(*SEED_ORDER)
+        .values_list("user_id", "losses", "byes")
+    )
+    if len(alive) < 2:
+        _rank_elimination(activity, alive[0][0] if alive else None)
+        return []
+    if len(alive) == 2:
+        return [("f", alive[0][0], alive[1][0])]
+
+    pairings = []
+    pools = defaultdict(list)
+    for user_id, losses, byes in alive:
+        pools[losses].append((user_id, byes))
+    for losses in sorted(pools):
+        pool = pools[losses]
+        if len(pool) < 2:
+            continue  # waits for the other bracket to catch up
+        bracket = "w" if losses == 0 else "l"
+        if len(pool) % 2:
+            bye = min(pool, key=lambda player: player[1])  # fewest byes, best seed on ties
+            pool.remove(bye)
+            pairings.append((bracket, bye[0], None))
+        pairings += [(bracket, a, b) for (a, _), (b, _) in _fold(pool)]
+    return pairings
+
+
+def _rank_elimination(activity, champion_id):
+    """Champion first, then everyone else by how late they were knocked out (shared ranks)."""
+    participants = ActivityParticipant.objects.filter(activity=activity)
+    participants.update(rank=None)
+    if champion_id is not None:
+        participants.filter(user_id=champion_id).update(rank=1)
+    per_round = (
+        participants.filter(eliminated_round__isnull=False)
+        .values("eliminated_round")
+        .annotate(n=Count("id"))
+        .order_by("-eliminated_round")
+        .values_list("eliminated_round", "n")
+    )
+    place = 2
+    for round_no, count in list(per_round):
+        participants.filter(eliminated_round=round_no).update(rank=place)
+        place += count
+
+
+def _next_swiss_round(activity, round_no):
+    rows = list(
+        ActivityParticipant.objects.filter(activity=activity)
+        .order_by("-points", *SEED_ORDER)
+        .values_list("user_id", "points", "byes")
+    )
+    pairs = list(Match.objects.filter(activity=activity, player_b__isnull=False).values_list("player_a_id", "player_b_id"))
+    if round_no >= (activity.rounds_planned or 0):
+        _rank_swiss(activity, rows, pairs)
+        return []
+    return _swiss_round(
+        [user_id for user_id, _, _ in rows],
+        {user_id: byes for user_id, _, byes in rows},
+        {_key(a, b) for a, b in pairs},
+    )
+
+
+def _swiss_round(order, byes, played):
+    """Pair ``order`` (best standing first) avoiding rematches; returns pairings."""
+    order = list(order)
+    pairings = []
+    if len(order) % 2:
+        # The lowest-standing player who has had the fewest byes sits out.
+        fewest = min(byes[user_id] for user_id in order)
+        bye = next(user_id for user_id in reversed(order) if byes[user_id] == fewest)
+        order.remove(bye)
+        pairings.append(("s", bye, None))
+
+    n = len(order)
+    nxt = list(range(1, n + 1))
+    prv = list(range(-1, n - 1))
+
+    def unlink(i):
+        if prv[i] >= 0:
+            nxt[prv[i]] = nxt[i]
+        if nxt[i] < n:
+            prv[nxt[i]] = prv[i]
+
+    pairs, leftover = [], []
+    first = 0
+    while first < n:
+        a = order[first]
+        unlink(first)
+        first = j = nxt[first]
+        # Only players already met are skipped, so this scans at most ~rounds entries.
+        while j < n and _key(a, order[j]) in played:
+            j = nxt[j]
+        if j == n:
+            leftover.append(a)
+            continue
+        unlink(j)
+        if j == first:
+            first = nxt[j]
+        pairs.append((a, order[j]))
+
+    while leftover:
+        a = leftover.pop(0)
+        b = next((user_id for user_id in leftover if _key(a, user_id) not in played), None)
+        if b is not None:
+            leftover.remove(b)
+            pairs.append((a, b))
+            continue
+        b = leftover.pop(0)
+        pairs.append(_swap(pairs, a, b, played))
+
+    return pairings + [("s", a, b) for a, b in pairs]
+
+
+def _swap(pairs, a, b, played):
+    """``a`` and ``b`` have met: trade partners with a recent pair, or accept the rematch."""
+    for k in range(len(pairs) - 1, max(len(pairs) - 1 - SWAP_WINDOW, -1), -1):
+        c, d = pairs[k]
+        for x, y in ((c, d), (d, c)):
+            if _key(a, x) not in played and _key(b, y) not in played:
+                pairs[k] = (x, a)
+                return (y, b)
+    return (a, b)
+
+
+def _rank_swiss(activity, rows, pairs):
+    """Rank by points, then Buchholz (opponents' points); equal pairs share a rank."""
+    points = {user_id: pts for user_id, pts, _ in rows}
+    buchholz = defaultdict(int)
+    for a, b in pairs:
+        buchholz[a] += points.get(b, 0)
+        buchholz[b] += points.get(a, 0)
+    groups = defaultdict(list)
+    for user_id, pts, _ in rows:
+        groups[(pts, buchholz[user_id])].append(user_id)
+    place = 1
+    for key in sorted(groups, reverse=True):
+        for chunk in _chunks(groups[key]):
+            ActivityParticipant.objects.filter(activity=activity, user_id__in=chunk).update(rank=place)
+        place += len(groups[key])
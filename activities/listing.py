@@ -0,0 +1,126 @@
+"""Activity listing and the public iCalendar feed.
+
+Both read a date window on ``start_at`` (served by ``activity_start_idx``):
+events from ``RECENT_DAYS`` ago to ``UPCOMING_DAYS`` ahead, anchored to the
+start of today so the window, and with it the feed's ETag, changes once a
+day rather than on every request. Older events are paged separately.
+
+The listing annotates the per-user ``joined``/``waiting`` flags in the same
+query. The participant count is the ``seats_taken`` counter kept by
+activities.services, so no COUNT over participants is needed.
+"""
+import datetime
+import hashlib
+
+from django.db.models import Count, Exists, Max, OuterRef
+from django.utils import timezone
+
+from courses.pagination import older_than
+
+from .models import Activity, ActivityParticipant, ActivityWaitlistEntry
+
+RECENT_DAYS = 7
+UPCOMING_DAYS = 90
+PAST_PAGE_SIZE = 30
+
+
+def default_window(now=None):
+    """``(start, end)`` of the default listing: recent and upcoming events."""
+    today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - datetime.timedelta(days=RECENT_DAYS), today + datetime.timedelta(days=UPCOMING_DAYS)
+
+
+def with_user_flags(queryset, user):
+    return queryset.select_related("created_by").annotate(
+        joined=Exists(ActivityParticipant.objects.filter(activity=OuterRef("pk"), user=user)),
+        waiting=Exists(ActivityWaitlistEntry.objects.filter(activity=OuterRef("pk"), user=user)),
+    )
+
+
+def window_queryset(start, end):
+    return Activity.objects.filter(start_at__gte=start, start_at__lt=end).order_by("start_at", "id")
+
+
+def past_queryset(before, cursor=None):
+    """Events that started before ``before``, newest first; ``cursor`` is ``(start_at, id)``."""
+    rows = Activity.objects.filter(start_at__lt=before)
+    if cursor:
+        rows = rows.filter(older_than(*cursor, field="start_at"))
+    return rows.order_by("-start_at", "-id")
+
+
+def feed_validators(start, end):
+    """``(etag, last_modified)`` of the feed for this window, from one aggregate query.
+
+    The ETag covers the window, the row count (catches deletions) and the newest
+    ``updated_at``. Last-Modified is never earlier than today's anchor, since
+    events also leave the window as days pass.
+    """
+    stamp = window_queryset(start, end).aggregate(last=Max("updated_at"), n=Count("id"))
+    today = start + datetime.timedelta(days=RECENT_DAYS)
+    last_modified = max(stamp["last"] or today, today)
+    key = f"{start.isoformat()}|{stamp['n']}|{stamp['last'].isoformat() if stamp['last'] else ''}"
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32], last_modified
+
+
+def _ical_text(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ical_time(value):
+    return value.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545, 3.1) without breaking UTF-8."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def ical(activities, host, list_url):
+    """Render ``activities`` as an iCalendar (VCALENDAR) document."""
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//N.O.K//Activities//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:N.O.K events",
+    ]
+    for activity in activities:
+        description = activity.description or ""
+        if activity.entry_fee_z:
+            description = f"Entry: {activity.entry_fee_z} Z\n{description}".strip()
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:activity-{activity.pk}@{host}",
+            f"DTSTAMP:{_ical_time(activity.updated_at)}",
+            f"LAST-MODIFIED:{_ical_time(activity.updated_at)}",
+            f"DTSTART:{_ical_time(activity.start_at)}",
+            f"DTEND:{_ical_time(activity.end_at)}",
+            f"SUMMARY:{_ical_text(activity.title)}",
+            f"CATEGORIES:{_ical_text(activity.get_activity_type_display())}",
+            f"URL:{list_url}",
+        ]
+        if description:
+            lines.append(f"DESCRIPTION:{_ical_text(description)}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
@@ -0,0 +1,40 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activities.brackets import advance_round, record_results, start_bracket
+from activities.models import Activity
+
+
+class Command(BaseCommand):
+    help = "Start a tournament bracket, or record results and pair the next round."
+
+    def add_arguments(self, parser):
+        parser.add_argument("activity_id", type=int)
+        parser.add_argument("--start", action="store_true", help="Seed participants by XP and pair round 1.")
+        parser.add_argument(
+            "--results",
+            help="CSV of match_id,result (a = player A won, b = player B won, d = draw) for the current round.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            activity = Activity.objects.get(pk=options["activity_id"])
+        except Activity.DoesNotExist:
+            raise CommandError(f"Activity {options['activity_id']} does not exist.")
+        try:
+            if options["start"]:
+                created = start_bracket(activity)
+                self.stdout.write(self.style.SUCCESS(f"Round 1 of {activity.title}: {created} match(es)."))
+                return
+            if options["results"]:
+                with open(options["results"], newline="", encoding="utf-8") as fh:
+                    results = {int(row[0]): row[1].strip().lower() for row in csv.reader(fh) if row}
+                self.stdout.write(f"Recorded {record_results(activity, results)} result(s).")
+            created = advance_round(activity)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Round {activity.current_round} of {activity.title}: {created} match(es)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{activity.title} is finished; final ranks are set."))
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from activities.models import Activity
+from activities.payouts import RULES, TOP_N, pay_out, parse_split, set_ranking
+
+
+class Command(BaseCommand):
+    help = "Pay out an activity's prize pool (or refund entry fees of a cancelled activity) in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("activity_id", type=int)
+        parser.add_argument("--rule", choices=RULES, default=TOP_N)
+        parser.add_argument("--split", help="Percentages per place for --rule top, e.g. 50,30,20 (the default).")
+        parser.add_argument(
+            "--ranking",
+            help="File with one username per line, winner first. Without it the ranks set in admin are used.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            activity = Activity.objects.get(pk=options["activity_id"])
+        except Activity.DoesNotExist:
+            raise CommandError(f"Activity {options['activity_id']} does not exist.")
+        try:
+            split = parse_split(options["split"]) if options["split"] else None
+            if options["ranking"]:
+                with open(options["ranking"], encoding="utf-8") as fh:
+                    usernames = [line.strip() for line in fh if line.strip()]
+                ids = dict(get_user_model().objects.filter(username__in=usernames).values_list("username", "id"))
+                unknown = [name for name in usernames if name not in ids]
+                if unknown:
+                    raise CommandError(f"Unknown user(s): {', '.join(unknown[:10])}")
+                set_ranking(activity, [ids[name] for name in usernames])
+            paid = pay_out(activity, options["rule"], split)
+        except ValueError as e:
+            raise CommandError(str(e))
+        total = sum(amount for _, amount in paid)
+        self.stdout.write(self.style.SUCCESS(f"Paid {total} Z to {len(paid)} participant(s) of {activity.title}."))
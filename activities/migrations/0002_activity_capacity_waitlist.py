@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_seats(apps, schema_editor):
+    Activity = apps.get_model("activities", "Activity")
+    ActivityParticipant = apps.get_model("activities", "ActivityParticipant")
+    Activity.objects.update(
+        seats_taken=Coalesce(
+            Subquery(
+                ActivityParticipant.objects.filter(activity_id=OuterRef("pk"))
+                .values("activity_id")
+                .annotate(n=Count("id"))
+                .values("n")
+            ),
+            Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='max_participants',
+            field=models.PositiveIntegerField(blank=True, help_text='Empty = unlimited', null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ActivityWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='activities.activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_waitlist', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['activity', 'id'], name='waitlist_queue_idx')],
+                'unique_together': {('activity', 'user')},
+            },
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
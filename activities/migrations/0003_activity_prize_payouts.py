@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0002_activity_capacity_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='prizes_paid_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='prize_z',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='rank',
+            field=models.PositiveIntegerField(blank=True, help_text='Final place, 1 = winner', null=True),
+        ),
+    ]
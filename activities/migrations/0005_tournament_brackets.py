@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activity_listing_calendar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='bracket_finished_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='bracket_format',
+            field=models.CharField(blank=True, choices=[('single', 'Single elimination'), ('double', 'Double elimination'), ('swiss', 'Swiss system')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='current_round',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='rounds_planned',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Swiss only; empty = enough rounds to find a single leader', null=True),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='byes',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='eliminated_round',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='losses',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='points',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Half-points (win 2, draw 1)'),
+        ),
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='seed_xp',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='XP when the bracket was seeded', null=True),
+        ),
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField()),
+                ('table', models.PositiveIntegerField()),
+                ('bracket', models.CharField(choices=[('w', 'Winners'), ('l', 'Losers'), ('f', 'Grand final'), ('s', 'Swiss')], max_length=1)),
+                ('result', models.CharField(blank=True, choices=[('', 'Pending'), ('a', 'Player A won'), ('b', 'Player B won'), ('d', 'Draw')], max_length=1)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='activities.activity')),
+                ('player_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('player_b', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('activity', 'round', 'table')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_fee_paid(apps, schema_editor):
+    # Earlier joins were charged the fee current at the time; the present fee is
+    # the best record of it that exists.
+    Activity = apps.get_model("activities", "Activity")
+    ActivityParticipant = apps.get_model("activities", "ActivityParticipant")
+    ActivityParticipant.objects.update(
+        fee_paid_z=Subquery(Activity.objects.filter(pk=OuterRef("activity_id")).values("entry_fee_z")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_tournament_brackets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityparticipant',
+            name='fee_paid_z',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_fee_paid, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,12 @@ ACTIVITY_TYPES = [
     ("hackathon", "Hackathon"),
 ]
 
+BRACKET_FORMATS = [
+    ("single", "Single elimination"),
+    ("double", "Double elimination"),
+    ("swiss", "Swiss system"),
+]
+
 class Activity(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="created_activities")
     activity_type = models.CharField(max_length=20, choices=ACTIVITY_TYPES)
@@ -19,17 +25,101 @@ class Activity(models.Model):
     end_at = models.DateTimeField()
     entry_fee_z = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     prize_pool_z = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    max_participants = models.PositiveIntegerField(null=True, blank=True, help_text="Empty = unlimited")
+    # Maintained by activities.services with conditional UPDATEs; never edit by hand.
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    prizes_paid_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Bumped on every save; seats_taken changes (queryset.update) leave it alone,
+    # so it tracks what the calendar feed shows.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Tournament structure; rounds are generated by activities.brackets.
+    bracket_format = models.CharField(max_length=10, choices=BRACKET_FORMATS, blank=True)
+    rounds_planned = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text="Swiss only; empty = enough rounds to find a single leader"
+    )
+    current_round = models.PositiveSmallIntegerField(default=0, editable=False)
+    bracket_finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Written only by conditional UPDATEs (services, brackets, payouts).
+    COUNTER_FIELDS = ("seats_taken", "prizes_paid_at", "current_round", "bracket_finished_at")
+
+    class Meta:
+        indexes = [models.Index(fields=["start_at"], name="activity_start_idx")]
 
     def __str__(self):
         return f"{self.title} ({self.activity_type})"
 
+    def save(self, *args, **kwargs):
+        # A full save of an instance loaded before concurrent joins would write its
+        # stale counters back, so updates leave the counter columns alone.
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def is_full(self):
+        return self.max_participants is not None and self.seats_taken >= self.max_participants
+
 class ActivityParticipant(models.Model):
     activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="participants")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="activities")
     joined_at = models.DateTimeField(auto_now_add=True)
+    rank = models.PositiveIntegerField(null=True, blank=True, help_text="Final place, 1 = winner")
+    prize_z = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Entry fee actually charged on joining; leaving and refund payouts return exactly this.
+    fee_paid_z = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Bracket standings, written in bulk by activities.brackets at each round advance.
+    seed_xp = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text="XP when the bracket was seeded")
+    points = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Half-points (win 2, draw 1)")
+    losses = models.PositiveSmallIntegerField(default=0, editable=False)
+    byes = models.PositiveSmallIntegerField(default=0, editable=False)
+    eliminated_round = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         unique_together = ("activity", "user")
 
     def __str__(self):
         return f"{self.user} -> {self.activity}"
+
+
+class ActivityWaitlistEntry(models.Model):
+    """Queued join request for a full activity; promoted in id order when a seat frees up."""
+
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="waitlist")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="activity_waitlist")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("activity", "user")
+        indexes = [models.Index(fields=["activity", "id"], name="waitlist_queue_idx")]
+
+    def __str__(self):
+        return f"{self.user} waiting for {self.activity}"
+
+
+class Match(models.Model):
+    """One pairing of a bracket round; ``player_b`` is empty for a bye."""
+
+    BRACKETS = [("w", "Winners"), ("l", "Losers"), ("f", "Grand final"), ("s", "Swiss")]
+    RESULTS = [("", "Pending"), ("a", "Player A won"), ("b", "Player B won"), ("d", "Draw")]
+
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="matches")
+    round = models.PositiveSmallIntegerField()
+    table = models.PositiveIntegerField()
+    bracket = models.CharField(max_length=1, choices=BRACKETS)
+    player_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    player_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", null=True, blank=True)
+    result = models.CharField(max_length=1, choices=RESULTS, blank=True)
+
+    class Meta:
+        unique_together = ("activity", "round", "table")
+
+    def __str__(self):
+        return f"{self.activity} R{self.round} #{self.table}"
+
+    @property
+    def winner_id(self):
+        return {"a": self.player_a_id, "b": self.player_b_id}.get(self.result)
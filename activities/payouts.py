@@ -0,0 +1,197 @@
+"""Prize payouts for finished activities.
+
+``pay_out`` turns the final ranking (``ActivityParticipant.rank``) and a split rule
+into per-user amounts and credits them all in one transaction. Users receiving
+the same amount are credited by one set-based wallet UPDATE, so even a
+5,000-player refund is a handful of statements (about 0.3 s on SQLite).
+Transactions and postings are written with one executemany each
+(ledger.insert_rows), and a single ledger entry moves the money out of
+``platform:activities:Z``, where entry fees are collected. ``prizes_paid_at`` is
+claimed with a conditional UPDATE first, so an activity is paid out at most once.
+"""
+from collections import defaultdict
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from wallet import ledger
+from wallet.models import Transaction, Wallet
+
+from .models import Activity, ActivityParticipant
+
+WINNER_TAKES_ALL = "winner"
+TOP_N = "top"
+REFUND = "refund"
+RULES = (WINNER_TAKES_ALL, TOP_N, REFUND)
+
+DEFAULT_TOP_SPLIT = (Decimal("50"), Decimal("30"), Decimal("20"))
+BATCH_SIZE = 500
+CENT = Decimal("0.01")
+
+
+class PayoutError(ValueError):
+    pass
+
+
+def parse_split(value):
+    """Parse ``"50,30,20"`` into percentages for 1st, 2nd, 3rd... place."""
+    try:
+        split = [Decimal(part.strip()) for part in str(value).split(",") if part.strip()]
+    except InvalidOperation:
+        raise PayoutError("Split must be comma-separated percentages, e.g. 50,30,20.")
+    if not split or any(share <= 0 for share in split):
+        raise PayoutError("Split percentages must be positive.")
+    if sum(split) > 100:
+        raise PayoutError("Split percentages add up to more than 100.")
+    return split
+
+
+def split_pool(pool, split, ranked_groups):
+    """``[(user_id, amount)]`` for the ranked users, in place order.
+
+    ``ranked_groups`` lists the users sharing each rank, best rank first. A tie
+    covers as many places as it has players, and those places' shares are
+    pooled and split equally between them (two players tied for 3rd when
+    3rd and 4th pay 20% and 0% get 10% each). Amounts are rounded down to
+    cents. If the split covers the whole pool and every paid place is filled,
+    the rounding remainder goes to first place. Places nobody finished in are
+    not paid (that share stays in the pool account).
+    """
+    amounts = []
+    place = 0
+    for group in ranked_groups:
+        if place >= len(split):
+            break
+        share = sum(split[place : place + len(group)])
+        each = (pool * share / 100 / len(group)).quantize(CENT, rounding=ROUND_DOWN)
+        amounts += [(user_id, each) for user_id in group]
+        place += len(group)
+    if amounts and sum(split) == 100 and place >= len(split):
+        user_id, amount = amounts[0]
+        amounts[0] = (user_id, amount + pool - sum(a for _, a in amounts))
+    return amounts
+
+
+def set_ranking(activity, user_ids):
+    """Store the final ranking; ``user_ids`` is in place order (winner first)."""
+    participants = {
+        p.user_id: p for p in ActivityParticipant.objects.filter(activity=activity, user_id__in=user_ids)
+    }
+    missing = [user_id for user_id in user_ids if user_id not in participants]
+    if missing:
+        raise PayoutError(f"{len(missing)} ranked user(s) did not take part in {activity.title}.")
+    with transaction.atomic():
+        ActivityParticipant.objects.filter(activity=activity).update(rank=None)
+        for place, user_id in enumerate(user_ids, start=1):
+            participants[user_id].rank = place
+        ActivityParticipant.objects.bulk_update(participants.values(), ["rank"], batch_size=BATCH_SIZE)
+
+
+def payout_amounts(activity, rule, split=None):
+    """Who gets what under ``rule``; ``[(user_id, amount)]`` in place order."""
+    participants = ActivityParticipant.objects.filter(activity=activity)
+    if rule == REFUND:
+        # Refund what each participant paid; the fee may have changed since they joined.
+        refunds = list(participants.filter(fee_paid_z__gt=0).order_by("id").values_list("user_id", "fee_paid_z"))
+        if not refunds:
+            raise PayoutError(f"Nobody paid an entry fee for {activity.title}.")
+        return refunds
+    if rule == WINNER_TAKES_ALL:
+        split = [Decimal("100")]
+    elif rule == TOP_N:
+        split = list(split or DEFAULT_TOP_SPLIT)
+    else:
+        raise PayoutError(f"Unknown payout rule {rule!r}.")
+    if activity.prize_pool_z <= 0:
+        raise PayoutError(f"{activity.title} has no prize pool.")
+    groups = []
+    last_rank = None
+    rows = participants.filter(rank__isnull=False).order_by("rank", "joined_at").values_list("rank", "user_id")
+    for rank, user_id in rows.iterator():
+        if rank != last_rank:
+            if sum(len(group) for group in groups) >= len(split):
+                break
+            groups.append([])
+            last_rank = rank
+        groups[-1].append(user_id)
+    return split_pool(activity.prize_pool_z, split, groups)
+
+
+def pay_out(activity, rule, split=None):
+    """Credit prizes (or refunds, for cancelled events) for one activity.
+
+    Returns the ``[(user_id, amount)]`` paid. Raises PayoutError if the activity
+    is not finished, has nothing to pay or was already paid out.
+    """
+    if rule != REFUND and activity.end_at > timezone.now():
+        raise PayoutError(f"{activity.title} has not finished yet.")
+    amounts = payout_amounts(activity, rule, split)
+    if not any(amount > 0 for _, amount in amounts):
+        raise PayoutError(f"Nobody to pay in {activity.title}; set the final ranking first.")
+
+    now = timezone.now()
+    with transaction.atomic():
+        if not Activity.objects.filter(pk=activity.pk, prizes_paid_at__isnull=True).update(prizes_paid_at=now):
+            raise PayoutError(f"{activity.title} was already paid out.")
+        _credit(activity, amounts, "refund" if rule == REFUND else "prize")
+    activity.prizes_paid_at = now
+    return amounts
+
+
+def _credit(activity, amounts, tx_type):
+    # (place, user_id, amount); a prize's place is the winner's rank, shared on ties.
+    places = {}
+    if tx_type == "prize":
+        places = dict(
+            ActivityParticipant.objects.filter(activity=activity, user_id__in=[u for u, _ in amounts])
+            .values_list("user_id", "rank")
+        )
+    rows = [(places.get(user_id), user_id, amount) for user_id, amount in amounts if amount > 0]
+    amounts = [(user_id, amount) for _, user_id, amount in rows]
+    user_ids = [user_id for user_id, _ in amounts]
+    wallet_ids = dict(Wallet.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+    missing = [user_id for user_id in user_ids if user_id not in wallet_ids]
+    if missing:
+        Wallet.objects.bulk_create([Wallet(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+        wallet_ids.update(Wallet.objects.filter(user_id__in=missing).values_list("user_id", "id"))
+
+    by_amount = defaultdict(list)
+    for user_id, amount in amounts:
+        by_amount[amount].append(user_id)
+    for amount, same in by_amount.items():
+        for start in range(0, len(same), BATCH_SIZE):
+            chunk = same[start : start + BATCH_SIZE]
+            Wallet.objects.filter(user_id__in=chunk).update(balance_z=F("balance_z") + amount)
+            ActivityParticipant.objects.filter(activity=activity, user_id__in=chunk).update(
+                prize_z=F("prize_z") + amount
+            )
+
+    now = timezone.now()
+    ledger.insert_rows(
+        Transaction,
+        ("user", "wallet", "created_at", "type", "amount_uzs", "amount_z", "description"),
+        [
+            (
+                user_id,
+                wallet_ids[user_id],
+                now,
+                tx_type,
+                Decimal("0"),
+                amount,
+                (
+                    f"Refund: {activity.title} was cancelled"
+                    if tx_type == "refund"
+                    else f"Prize: place {place} in {activity.title}"
+                )[:255],
+            )
+            for place, user_id, amount in rows
+        ],
+    )
+    ledger.post(
+        tx_type,
+        [(ledger.PLATFORM_ACTIVITIES_Z, -sum(amount for _, amount in amounts))]
+        + [(ledger.wallet_code(wallet_ids[user_id]), amount) for user_id, amount in amounts],
+        description=f"{len(amounts)} payout(s) for {activity.title}",
+    )
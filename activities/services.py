@@ -0,0 +1,163 @@
+"""Joining and leaving activities under burst load.
+
+A join is one short transaction. It reserves a seat with a conditional UPDATE
+(``seats_taken < max_participants``), charges the entry fee with a conditional
+wallet debit, then inserts the participant with the fee it paid (refunds return
+exactly that amount). Any failure rolls all three back.
+When no seat is left the user is queued on the waitlist instead. Freed seats
+promote the queue in order, charging each promoted user at that moment.
+
+Seats only change hands while the activity is open: it has not started, has
+no bracket yet and has not been paid out (or refunded). Every seat UPDATE
+carries that condition, so a stale instance cannot join, leave or promote
+into a closed activity.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from wallet import ledger, operations as wallet_ops
+from wallet.models import Transaction
+
+from .models import Activity, ActivityParticipant, ActivityWaitlistEntry
+
+JOINED = "joined"
+WAITLISTED = "waitlisted"
+ALREADY_JOINED = "already_joined"
+
+
+class ActivityClosed(ValueError):
+    pass
+
+
+def _open(activity):
+    return Activity.objects.filter(
+        pk=activity.pk, start_at__gt=timezone.now(), prizes_paid_at__isnull=True, current_round=0
+    )
+
+
+def is_open(activity):
+    """True while seats can still be taken or given up."""
+    return _open(activity).exists()
+
+
+def _reserve_seat(activity):
+    return bool(
+        _open(activity)
+        .filter(Q(max_participants__isnull=True) | Q(seats_taken__lt=F("max_participants")))
+        .update(seats_taken=F("seats_taken") + 1)
+    )
+
+
+def _charge_fee(activity, user):
+    """Debit the current entry fee (read from the row, not ``activity``); returns what was charged."""
+    fee = Activity.objects.filter(pk=activity.pk).values_list("entry_fee_z", flat=True).get()
+    if fee <= 0:
+        return fee
+    wallet = user.wallet
+    wallet_ops.debit(wallet, z=fee, message="Not enough Z coins to join this event.")
+    Transaction.objects.create(
+        user=user,
+        wallet=wallet,
+        type="tournament_fee",
+        amount_z=-fee,
+        description=f"Joined {activity.title}",
+    )
+    ledger.post(
+        "tournament_fee",
+        [(ledger.wallet_code(wallet), -fee), (ledger.PLATFORM_ACTIVITIES_Z, fee)],
+        description=f"{user.username} joined {activity.title}",
+    )
+    return fee
+
+
+def _take_seat(activity, user):
+    """Reserve, charge, insert and leave the waitlist atomically.
+
+    Returns JOINED, ALREADY_JOINED or None when the activity is full.
+    """
+    try:
+        with transaction.atomic():
+            if not _reserve_seat(activity):
+                return None
+            fee = _charge_fee(activity, user)
+            ActivityParticipant.objects.create(activity=activity, user=user, fee_paid_z=fee)
+            ActivityWaitlistEntry.objects.filter(activity=activity, user=user).delete()
+    except IntegrityError:
+        return ALREADY_JOINED
+    return JOINED
+
+
+def join_activity(activity, user):
+    """Join ``activity`` or queue for it.
+
+    Returns JOINED, WAITLISTED or ALREADY_JOINED. Raises wallet.operations.InsufficientFunds
+    (a ValueError) if the fee cannot be paid, or ActivityClosed once the activity
+    has started or finished; nothing is reserved in either case.
+    """
+    if ActivityParticipant.objects.filter(activity=activity, user=user).exists():
+        return ALREADY_JOINED
+    result = _take_seat(activity, user)
+    if result is None:
+        if not is_open(activity):
+            raise ActivityClosed("This event has already started or finished.")
+        ActivityWaitlistEntry.objects.get_or_create(activity=activity, user=user)
+        return WAITLISTED
+    return result
+
+
+def leave_activity(activity, user):
+    """Give up a seat (refunding the fee paid to join) and promote the waitlist; False if not joined.
+
+    Leaving the waitlist is always allowed. Giving up a seat raises ActivityClosed
+    once the activity has started, has a bracket or was paid out.
+    """
+    with transaction.atomic():
+        seat = ActivityParticipant.objects.filter(activity=activity, user=user)
+        fee = seat.values_list("fee_paid_z", flat=True).first()
+        if fee is None or not seat.delete()[0]:
+            ActivityWaitlistEntry.objects.filter(activity=activity, user=user).delete()
+            return False
+        if not _open(activity).filter(seats_taken__gt=0).update(seats_taken=F("seats_taken") - 1):
+            raise ActivityClosed("This event has already started or finished; you can no longer leave it.")
+        if fee > 0:
+            wallet = user.wallet
+            wallet_ops.credit(wallet, z=fee)
+            Transaction.objects.create(
+                user=user,
+                wallet=wallet,
+                type="refund",
+                amount_z=fee,
+                description=f"Left {activity.title}",
+            )
+            ledger.post(
+                "refund",
+                [(ledger.PLATFORM_ACTIVITIES_Z, -fee), (ledger.wallet_code(wallet), fee)],
+                description=f"{user.username} left {activity.title}",
+            )
+    promote_waitlist(activity)
+    return True
+
+
+def promote_waitlist(activity):
+    """Move queued users into free seats in arrival order; returns how many joined.
+
+    Users who can no longer pay the fee are dropped from the queue. Nobody is
+    promoted into a closed activity.
+    """
+    promoted = 0
+    if not is_open(activity):
+        return promoted
+    queue = ActivityWaitlistEntry.objects.filter(activity=activity).select_related("user").order_by("id")
+    for entry in queue.iterator():
+        try:
+            result = _take_seat(activity, entry.user)
+        except wallet_ops.InsufficientFunds:
+            result = "unpaid"
+        if result is None:
+            break
+        if result == JOINED:
+            promoted += 1
+        else:
+            entry.delete()
+    return promoted
@@ -5,5 +5,8 @@ app_name = "activities"
 
 urlpatterns = [
     path("", views.activity_list, name="activity_list"),
+    path("calendar.ics", views.activity_calendar, name="activity_calendar"),
     path("<int:activity_id>/join/", views.join_activity, name="join_activity"),
+    path("<int:activity_id>/leave/", views.leave_activity, name="leave_activity"),
+    path("<int:activity_id>/bracket/", views.activity_bracket, name="activity_bracket"),
 ]
@@ -1,39 +1,120 @@
-from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Activity, ActivityParticipant
-from wallet.models import Transaction
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST
+from courses.pagination import InvalidCursor, decode_cursor, keyset_page
+from django.db.models import Q
+from .models import Activity, Match
+from . import listing, services
+
+CALENDAR_MAX_AGE = 300
+BRACKET_PAGE_SIZE = 100
 
 @login_required
 def activity_list(request):
-    activities = Activity.objects.all().order_by("start_at")
-    return render(request, "activities/activity_list.html", {"activities": activities})
+    start, end = listing.default_window()
+    show_past = request.GET.get("show") == "past"
+    next_cursor = None
+    if show_past:
+        try:
+            cursor = decode_cursor(request.GET["cursor"]) if request.GET.get("cursor") else None
+        except InvalidCursor:
+            cursor = None
+        activities, next_cursor = keyset_page(
+            listing.with_user_flags(listing.past_queryset(start, cursor), request.user),
+            listing.PAST_PAGE_SIZE,
+            field="start_at",
+        )
+    else:
+        activities = listing.with_user_flags(listing.window_queryset(start, end), request.user)
+    return render(
+        request,
+        "activities/activity_list.html",
+        {"activities": activities, "show_past": show_past, "next_cursor": next_cursor},
+    )
+
+@login_required
+def activity_bracket(request, activity_id):
+    """One round of a tournament bracket, ``BRACKET_PAGE_SIZE`` tables per page (``?after=<table>``)."""
+    activity = get_object_or_404(Activity, id=activity_id)
+    try:
+        round_no = int(request.GET.get("round") or activity.current_round)
+        after = int(request.GET.get("after") or 0)
+    except ValueError:
+        round_no, after = activity.current_round, 0
+    round_matches = Match.objects.filter(activity=activity, round=round_no).select_related("player_a", "player_b")
+    matches = list(round_matches.filter(table__gt=after).order_by("table")[: BRACKET_PAGE_SIZE + 1])
+    next_after = matches[BRACKET_PAGE_SIZE - 1].table if len(matches) > BRACKET_PAGE_SIZE else None
+    my_match = round_matches.filter(Q(player_a=request.user) | Q(player_b=request.user)).first()
+    standings = activity.participants.select_related("user").filter(rank__isnull=False).order_by("rank")[:10]
+    return render(
+        request,
+        "activities/bracket.html",
+        {
+            "activity": activity,
+            "round_no": round_no,
+            "rounds": range(1, activity.current_round + 1),
+            "matches": matches[:BRACKET_PAGE_SIZE],
+            "next_after": next_after,
+            "my_match": my_match,
+            "standings": standings if activity.bracket_finished_at else [],
+        },
+    )
+
+@require_GET
+def activity_calendar(request):
+    """Public iCalendar feed of recent and upcoming activities.
+
+    Polling clients are answered from one aggregate query: 304 when their
+    ETag / Last-Modified still matches, the full feed otherwise.
+    """
+    start, end = listing.default_window()
+    etag, last_modified = listing.feed_validators(start, end)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        body = listing.ical(
+            listing.window_queryset(start, end),
+            host=request.get_host().split(":")[0],
+            list_url=request.build_absolute_uri(reverse("activities:activity_list")),
+        )
+        response = HttpResponse(body, content_type="text/calendar; charset=utf-8")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, public=True, max_age=CALENDAR_MAX_AGE)
+    return response
 
 @login_required
 def join_activity(request, activity_id):
     activity = get_object_or_404(Activity, id=activity_id)
-    user = request.user
     if request.method == "POST":
-        if ActivityParticipant.objects.filter(activity=activity, user=user).exists():
-            messages.info(request, "You are already in this event.")
+        try:
+            result = services.join_activity(activity, request.user)
+        except ValueError as e:
+            messages.error(request, str(e))
             return redirect("activities:activity_list")
+        if result == services.ALREADY_JOINED:
+            messages.info(request, "You are already in this event.")
+        elif result == services.WAITLISTED:
+            messages.info(request, "This event is full. You are on the waitlist and will join automatically when a seat frees up.")
+        else:
+            messages.success(request, "Welcome to the event! Show your best and learn with others.")
+    return redirect("activities:activity_list")
 
-        fee = activity.entry_fee_z
-        if fee > 0:
-            wallet = user.wallet
-            if wallet.balance_z < fee:
-                messages.error(request, "Not enough Z coins to join this event.")
-                return redirect("activities:activity_list")
-            wallet.spend_z(fee)
-            Transaction.objects.create(
-                user=user,
-                wallet=wallet,
-                type="tournament_fee",
-                amount_z=-fee,
-                description=f"Joined {activity.title}",
-            )
-        ActivityParticipant.objects.create(activity=activity, user=user)
-        messages.success(request, "Welcome to the event! Show your best and learn with others.")
+@login_required
+@require_POST
+def leave_activity(request, activity_id):
+    activity = get_object_or_404(Activity, id=activity_id)
+    try:
+        left = services.leave_activity(activity, request.user)
+    except ValueError as e:
+        messages.error(request, str(e))
         return redirect("activities:activity_list")
+    if left:
+        messages.success(request, "You left the event. Your entry fee was refunded.")
+    else:
+        messages.info(request, "You are no longer waiting for this event.")
     return redirect("activities:activity_list")
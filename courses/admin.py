@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Course, CoursePart, Lesson, Enrollment, Review
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from .forms import CourseBundleImportForm
+from .importers import BundleError, import_bundle, parse_bundle
+from .models import Course, CoursePart, Lesson, LessonCompletion, Enrollment, Review
 
 class LessonInline(admin.TabularInline):
     model = Lesson
@@ -13,6 +19,44 @@ class CoursePartInline(admin.TabularInline):
 class CourseAdmin(admin.ModelAdmin):
     list_display = ("title", "subject", "teacher", "is_active", "created_at")
     inlines = [CoursePartInline]
+    change_list_template = "admin/courses/course/change_list.html"
+
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_bundle_view), name="courses_course_import"),
+        ] + super().get_urls()
+
+    def import_bundle_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect("admin:courses_course_changelist")
+
+        form = CourseBundleImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            data = form.cleaned_data
+            upload = data["bundle"]
+            teacher = data["teacher"] or (request.user if getattr(request.user, "role", "") == "teacher" else None)
+            try:
+                bundle = parse_bundle(
+                    upload.read().decode("utf-8-sig"),
+                    filename=upload.name,
+                    title=data["title"],
+                    subject=data["subject"],
+                    description=data["description"],
+                )
+                course, num_parts, num_lessons = import_bundle(bundle, teacher=teacher, course=data["course"])
+            except (BundleError, UnicodeDecodeError) as e:
+                form.add_error("bundle", str(e))
+            else:
+                messages.success(request, f"Imported {num_parts} part(s) and {num_lessons} lesson(s) into '{course}'.")
+                return redirect(reverse("admin:courses_course_change", args=[course.pk]))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import course bundle",
+            "form": form,
+        }
+        return TemplateResponse(request, "admin/courses/course/import_bundle.html", context)
 
 @admin.register(CoursePart)
 class CoursePartAdmin(admin.ModelAdmin):
@@ -30,3 +74,7 @@ class EnrollmentAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("course", "student", "rating", "created_at")
+
+@admin.register(LessonCompletion)
+class LessonCompletionAdmin(admin.ModelAdmin):
+    list_display = ("student", "lesson", "completed_at")
@@ -0,0 +1,151 @@
+"""Read-only JSON endpoints for the mobile app."""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_http_methods
+
+from . import chat, messaging
+from .models import Course, CourseGroupMessage
+from .pagination import InvalidCursor, decode_cursor, keyset_page, older_than
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CHAT_PAGE_SIZE = 50
+CHAT_POLL_INTERVAL = 1.0
+
+
+def json_response_with_etag(request, payload):
+    """Serialize ``payload`` and answer 304 if the client already has these exact bytes."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":"))
+    etag = '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32]
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _course_json(course):
+    return {
+        "id": course.pk,
+        "title": course.title,
+        "subject": course.subject,
+        "description": course.description,
+        "teacher": {"id": course.teacher_id, "username": course.teacher.username},
+        "rating": {"average": round(course.average_rating(), 2), "count": course.rating_count},
+        "created_at": course.created_at,
+    }
+
+
+@require_GET
+def course_catalog(request):
+    """Active courses, newest first, paged with a ``cursor`` token.
+
+    Query params: ``subject`` (exact, case-insensitive), ``min_rating``,
+    ``limit`` (1..100) and ``cursor`` (``next_cursor`` of the previous page).
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        min_rating = float(request.GET["min_rating"]) if request.GET.get("min_rating") else None
+    except ValueError:
+        return JsonResponse({"error": "limit and min_rating must be numbers"}, status=400)
+
+    courses = (
+        Course.objects.filter(is_active=True)
+        .select_related("teacher")
+        .order_by("-created_at", "-id")
+    )
+    subject = (request.GET.get("subject") or "").strip()
+    if subject:
+        courses = courses.filter(subject__iexact=subject)
+    if min_rating is not None:
+        courses = courses.filter(rating_count__gt=0, rating_sum__gte=F("rating_count") * min_rating)
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            courses = courses.filter(older_than(*decode_cursor(cursor)))
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    rows, next_cursor = keyset_page(courses, limit)
+    return json_response_with_etag(request, {
+        "results": [_course_json(c) for c in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def course_chat(request, course_id):
+    """Course group chat.
+
+    GET without ``after`` returns the latest messages. GET with ``after`` (the
+    ``cursor`` of a previous response) returns only newer messages, waiting up
+    to ``wait`` seconds for one to arrive. POST ``text`` sends a message.
+    """
+    if not chat.can_access_chat(request.user, course_id):
+        return JsonResponse({"error": "Only enrolled students and the teacher can use this chat."}, status=403)
+
+    if request.method == "POST":
+        text = (request.POST.get("text") or "").strip()
+        if not text:
+            return JsonResponse({"error": "Message is empty."}, status=400)
+        message = CourseGroupMessage.objects.create(
+            course_id=course_id, user=request.user, text=text[: chat.MAX_MESSAGE_LENGTH]
+        )
+        return JsonResponse({"message": chat.message_json(message), "cursor": chat.cursor_for(message)}, status=201)
+
+    after = request.GET.get("after")
+    if not after:
+        rows = chat.latest_messages(course_id, CHAT_PAGE_SIZE)
+        return JsonResponse({
+            "messages": [chat.message_json(m) for m in rows],
+            "cursor": chat.cursor_for(rows[-1]) if rows else None,
+            "has_more": False,
+        })
+
+    try:
+        created_at, pk = decode_cursor(after)
+        wait = min(max(float(request.GET.get("wait", 0)), 0), settings.COURSE_CHAT_LONG_POLL_SECONDS)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({"error": "Invalid cursor or wait."}, status=400)
+
+    deadline = time.monotonic() + wait
+    while True:
+        rows, has_more = chat.messages_after(course_id, created_at, pk, CHAT_PAGE_SIZE)
+        if rows or time.monotonic() >= deadline:
+            break
+        time.sleep(min(CHAT_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+    return JsonResponse({
+        "messages": [chat.message_json(m) for m in rows],
+        "cursor": chat.cursor_for(rows[-1]) if rows else after,
+        "has_more": has_more,
+    })
+
+
+@login_required
+@require_GET
+def inbox(request):
+    """Direct-message threads of the current user, newest activity first, cursor-paged."""
+    states = messaging.inbox(request.user)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            states = states.filter(older_than(*decode_cursor(cursor), field="last_message_at"))
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+    rows, next_cursor = keyset_page(states, CHAT_PAGE_SIZE, field="last_message_at")
+    return JsonResponse({
+        "threads": [messaging.thread_json(state, request.user) for state in rows],
+        "next_cursor": next_cursor,
+    })
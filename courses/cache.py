@@ -0,0 +1,53 @@
+"""Versioned cache keys for per-course data.
+
+Every course has a version number stored in the shared cache. Cached data
+for the course (template fragments, the parts list) embeds the version in
+its key, so bumping the version makes all of it unreachable at once, in
+every worker, without having to know or delete the individual keys. Only
+get/add/set/incr are used, so this works the same on the local-memory,
+file and database cache backends.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(course_id):
+    return f"course:{course_id}:version"
+
+
+def _fresh_version():
+    # Time-based start value: if the version key is evicted, the new version
+    # can't collide with one that older cached entries were stored under.
+    return time.time_ns() // 1000
+
+
+def course_cache_version(course_id):
+    key = _version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_course_version(course_id):
+    key = _version_key(course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def invalidate_course(course_id):
+    """Bump the course version once the current transaction commits."""
+    if course_id is not None:
+        transaction.on_commit(lambda: bump_course_version(course_id))
+
+
+def cached_course_data(course_id, version, name, compute):
+    """``cache.get_or_set`` under a key scoped to the course's current version."""
+    key = f"course:{course_id}:{version}:{name}"
+    return cache.get_or_set(key, compute, timeout=settings.COURSE_DETAIL_CACHE_TIMEOUT)
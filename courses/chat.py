@@ -0,0 +1,65 @@
+"""Course group chat: access checks and incremental message fetches."""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Course, CourseGroupMessage, Enrollment
+from .pagination import encode_cursor, newer_than
+
+ACCESS_CACHE_SECONDS = 60 * 10
+DENIED_CACHE_SECONDS = 30
+MAX_MESSAGE_LENGTH = 2000
+
+
+def _access_key(course_id, user_id):
+    return f"course:{course_id}:chat-access:{user_id}"
+
+
+def can_access_chat(user, course_id):
+    """Teacher of the course or enrolled in any of its parts; one query, then cached."""
+    key = _access_key(course_id, user.pk)
+    allowed = cache.get(key)
+    if allowed is None:
+        enrolled = Enrollment.objects.filter(student=user, part__course_id=OuterRef("pk"))
+        allowed = Course.objects.filter(pk=course_id).filter(Q(teacher=user) | Q(Exists(enrolled))).exists()
+        cache.set(key, allowed, ACCESS_CACHE_SECONDS if allowed else DENIED_CACHE_SECONDS)
+    return allowed
+
+
+def forget_chat_access(course_id, user_id):
+    """Drop the cached access check once the current transaction commits (enrollment changed)."""
+    transaction.on_commit(lambda: cache.delete(_access_key(course_id, user_id)))
+
+
+def _messages(course_id):
+    return (
+        CourseGroupMessage.objects.filter(course_id=course_id)
+        .select_related("user")
+        .only("id", "text", "created_at", "user__id", "user__username", "user__display_name")
+    )
+
+
+def latest_messages(course_id, limit):
+    """The newest ``limit`` messages, oldest first."""
+    rows = list(_messages(course_id).order_by("-created_at", "-id")[:limit])
+    rows.reverse()
+    return rows
+
+
+def messages_after(course_id, created_at, pk, limit):
+    """Up to ``limit`` messages after the cursor, oldest first, plus whether more remain."""
+    rows = list(_messages(course_id).filter(newer_than(created_at, pk)).order_by("created_at", "id")[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def message_json(message):
+    return {
+        "id": message.pk,
+        "user": {"id": message.user_id, "name": message.user.display_name or message.user.username},
+        "text": message.text,
+        "created_at": message.created_at,
+    }
+
+
+def cursor_for(message):
+    return encode_cursor(message.created_at, message.pk)
@@ -0,0 +1,21 @@
+from django import forms
+from django.contrib.auth import get_user_model
+
+from .models import Course
+
+
+class CourseBundleImportForm(forms.Form):
+    bundle = forms.FileField(help_text="A .json or .csv course bundle.")
+    teacher = forms.ModelChoiceField(
+        queryset=get_user_model().objects.filter(role="teacher"),
+        required=False,
+        help_text="Owner of the new course (defaults to you if you are a teacher).",
+    )
+    course = forms.ModelChoiceField(
+        queryset=Course.objects.all(),
+        required=False,
+        help_text="Append the parts to this course instead of creating a new one.",
+    )
+    title = forms.CharField(required=False, max_length=255, help_text="Course title (CSV bundles).")
+    subject = forms.CharField(required=False, max_length=100, help_text="Course subject (CSV bundles).")
+    description = forms.CharField(required=False, widget=forms.Textarea(attrs={"rows": 3}))
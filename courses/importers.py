@@ -0,0 +1,219 @@
+"""Bulk import of course bundles (JSON or CSV) without per-row queries.
+
+A bundle is normalized to::
+
+    {
+        "title": "...", "subject": "...", "description": "...",
+        "parts": [
+            {"name": "...", "description": "...", "price_z": "10",
+             "lessons": [{"title": "...", "lesson_type": "video", "video_url": "...",
+                          "content": "...", "is_preview": false}, ...]},
+            ...
+        ],
+    }
+
+CSV bundles have one row per lesson with the columns ``part``, ``price_z``,
+``lesson_title``, ``lesson_type`` and optionally ``part_description``,
+``video_url``, ``content`` and ``is_preview``; course fields come from the
+caller. Parts keep the order they first appear in.
+"""
+import csv
+import io
+import json
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import Count, Q
+
+from . import search
+from .cache import invalidate_course
+from .models import Course, CoursePart, Lesson
+
+BATCH_SIZE = 500
+LESSON_TYPES = {code for code, _ in Lesson.LESSON_TYPE}
+_TRUE = {"1", "true", "yes", "y"}
+
+
+class BundleError(ValueError):
+    pass
+
+
+def _flag(value):
+    """JSON/CSV boolean: real booleans as-is, strings like "false" or "0" are False."""
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value)
+
+
+def parse_json_bundle(text):
+    try:
+        bundle = json.loads(text)
+    except ValueError as e:
+        raise BundleError(f"Invalid JSON: {e}")
+    if not isinstance(bundle, dict) or not isinstance(bundle.get("parts"), list):
+        raise BundleError("A JSON bundle must be an object with a 'parts' list.")
+    return bundle
+
+
+def parse_csv_bundle(text, **course_fields):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"part", "price_z", "lesson_title", "lesson_type"} - set(reader.fieldnames or [])
+    if missing:
+        raise BundleError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+
+    parts = {}
+    for row in reader:
+        name = (row.get("part") or "").strip()
+        part = parts.get(name)
+        if part is None:
+            part = parts[name] = {
+                "name": name,
+                "description": row.get("part_description") or "",
+                "price_z": row.get("price_z"),
+                "lessons": [],
+            }
+        lesson = {
+            "title": row.get("lesson_title"),
+            "lesson_type": row.get("lesson_type"),
+            "video_url": row.get("video_url") or None,
+            "content": row.get("content") or "",
+        }
+        if (row.get("is_preview") or "").strip():
+            lesson["is_preview"] = row["is_preview"].strip().lower() in _TRUE
+        part["lessons"].append(lesson)
+    return {**course_fields, "parts": list(parts.values())}
+
+
+def parse_bundle(text, filename="", **course_fields):
+    if filename.lower().endswith(".csv"):
+        return parse_csv_bundle(text, **course_fields)
+    bundle = parse_json_bundle(text)
+    for key, value in course_fields.items():
+        if value:
+            bundle.setdefault(key, value)
+    return bundle
+
+
+def _price(value, part_name):
+    try:
+        price = Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        raise BundleError(f"Part '{part_name}': invalid price_z {value!r}")
+    if not price.is_finite():
+        raise BundleError(f"Part '{part_name}': invalid price_z {value!r}")
+    if price < 0:
+        raise BundleError(f"Part '{part_name}': price_z can't be negative")
+    field = CoursePart._meta.get_field("price_z")
+    try:
+        price = price.quantize(Decimal(1).scaleb(-field.decimal_places), rounding=ROUND_HALF_UP)
+        field.run_validators(price)
+    except (InvalidOperation, ValidationError):
+        raise BundleError(f"Part '{part_name}': price_z {value!r} is too large")
+    return price
+
+
+def _build_lessons(part_name, rows):
+    """Validate lesson rows and assign order and preview flags in one pass."""
+    if not isinstance(rows, list):
+        raise BundleError(f"Part '{part_name}': lessons must be a list")
+    for order, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise BundleError(f"Part '{part_name}', lesson {order + 1}: must be an object")
+    lessons = []
+    explicit_preview = any(_flag(row.get("is_preview")) for row in rows)
+    for order, row in enumerate(rows):
+        title = (row.get("title") or "").strip()
+        lesson_type = (row.get("lesson_type") or "").strip()
+        if not title:
+            raise BundleError(f"Part '{part_name}', lesson {order + 1}: title is required")
+        if lesson_type not in LESSON_TYPES:
+            raise BundleError(f"Part '{part_name}', lesson '{title}': unknown lesson_type {lesson_type!r}")
+        # Same rule as Lesson.save(): the first lesson is the preview unless the bundle picks one.
+        is_preview = _flag(row.get("is_preview")) if explicit_preview else order == 0
+        lessons.append(Lesson(
+            title=title,
+            lesson_type=lesson_type,
+            video_url=row.get("video_url") or None,
+            content=row.get("content") or "",
+            order=order,
+            is_preview=is_preview,
+        ))
+    return lessons
+
+
+def recount_lessons(part_ids):
+    """Recompute num_videos/num_texts for the given parts with one grouped query."""
+    counts = (
+        Lesson.objects.filter(part_id__in=part_ids)
+        .values("part_id")
+        .annotate(
+            videos=Count("id", filter=Q(lesson_type="video")),
+            texts=Count("id", filter=Q(lesson_type="text")),
+        )
+    )
+    by_part = {row["part_id"]: row for row in counts}
+    parts = list(CoursePart.objects.filter(pk__in=part_ids).only("id", "num_videos", "num_texts"))
+    for part in parts:
+        row = by_part.get(part.pk, {})
+        part.num_videos = row.get("videos", 0)
+        part.num_texts = row.get("texts", 0)
+    CoursePart.objects.bulk_update(parts, ["num_videos", "num_texts"], batch_size=BATCH_SIZE)
+
+
+def import_bundle(bundle, teacher=None, course=None):
+    """Create a course (or extend ``course``) with all parts and lessons from ``bundle``.
+
+    Parts and lessons are inserted with bulk_create, so Lesson.save() and
+    model signals don't run per row; the search index and the course cache
+    are refreshed once at the end. Returns ``(course, num_parts, num_lessons)``.
+    """
+    parts_data = bundle.get("parts") or []
+    if not parts_data:
+        raise BundleError("The bundle has no parts.")
+
+    parts, lessons_by_part = [], []
+    for number, part_data in enumerate(parts_data, start=1):
+        if not isinstance(part_data, dict):
+            raise BundleError(f"Part {number}: must be an object")
+        name = (part_data.get("name") or "").strip()
+        if not name:
+            raise BundleError("Every part needs a name.")
+        parts.append(CoursePart(
+            name=name,
+            description=part_data.get("description") or "",
+            price_z=_price(part_data.get("price_z"), name),
+        ))
+        lessons_by_part.append(_build_lessons(name, part_data.get("lessons") or []))
+
+    with db_transaction.atomic():
+        if course is None:
+            title = (bundle.get("title") or "").strip()
+            subject = (bundle.get("subject") or "").strip()
+            if not (title and subject):
+                raise BundleError("A new course needs a title and a subject.")
+            if teacher is None:
+                raise BundleError("A new course needs a teacher.")
+            course = Course.objects.create(
+                teacher=teacher,
+                title=title,
+                subject=subject,
+                description=bundle.get("description") or "",
+            )
+
+        for part in parts:
+            part.course = course
+        parts = CoursePart.objects.bulk_create(parts, batch_size=BATCH_SIZE)
+
+        lessons = []
+        for part, part_lessons in zip(parts, lessons_by_part):
+            for lesson in part_lessons:
+                lesson.part = part
+            lessons.extend(part_lessons)
+        Lesson.objects.bulk_create(lessons, batch_size=BATCH_SIZE)
+
+        recount_lessons([p.pk for p in parts])
+        search.index_course(course)
+        invalidate_course(course.pk)
+
+    return course, len(parts), len(lessons)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.recommendations import CHUNK_SIZE, TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Rebuild 'also bought' course recommendations (incremental unless --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every course, not only changed ones.")
+        parser.add_argument("--top-k", type=int, default=TOP_K)
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            build = build_recommendations(
+                full=options["full"], top_k=options["top_k"], chunk_size=options["chunk_size"]
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full' if build.full else 'Incremental'} build: refreshed {build.courses_refreshed} course(s) "
+            f"up to enrollment #{build.last_enrollment_id} in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importers import BundleError, import_bundle, parse_bundle
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Import a course bundle (JSON or CSV) with bulk inserts. See courses/importers.py for the format."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to a .json or .csv bundle.")
+        parser.add_argument("--teacher", help="Username of the teacher who owns the new course.")
+        parser.add_argument("--course", type=int, help="Append the parts to this existing course instead.")
+        parser.add_argument("--title", default="", help="Course title (CSV bundles).")
+        parser.add_argument("--subject", default="", help="Course subject (CSV bundles).")
+        parser.add_argument("--description", default="", help="Course description (CSV bundles).")
+
+    def handle(self, *args, **options):
+        teacher = course = None
+        if options["course"]:
+            course = Course.objects.filter(pk=options["course"]).first()
+            if course is None:
+                raise CommandError(f"Course {options['course']} does not exist.")
+        elif options["teacher"]:
+            teacher = get_user_model().objects.filter(username=options["teacher"]).first()
+            if teacher is None:
+                raise CommandError(f"User {options['teacher']!r} does not exist.")
+        else:
+            raise CommandError("Pass --teacher for a new course or --course to extend one.")
+
+        with open(options["path"], encoding="utf-8-sig") as fh:
+            text = fh.read()
+
+        started = time.monotonic()
+        try:
+            bundle = parse_bundle(
+                text,
+                filename=options["path"],
+                title=options["title"],
+                subject=options["subject"],
+                description=options["description"],
+            )
+            course, num_parts, num_lessons = import_bundle(bundle, teacher=teacher, course=course)
+        except BundleError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {num_parts} part(s) and {num_lessons} lesson(s) into '{course}' "
+            f"(id {course.pk}) in {time.monotonic() - started:.2f}s."
+        ))
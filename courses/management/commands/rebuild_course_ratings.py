@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from courses.services import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized rating_count/rating_sum on every Course from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_ids", nargs="*", type=int, help="Only rebuild these courses.")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course_ids"]:
+            courses = courses.filter(pk__in=options["course_ids"])
+        updated = rebuild_rating_aggregates(courses)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} course(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FTS5 course search index from Course and CoursePart rows."
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(self.style.WARNING("FTS5 index is not available on this database; search uses the ORM fallback."))
+            return
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} course(s)."))
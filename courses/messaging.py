@@ -0,0 +1,83 @@
+"""Teacher ↔ student direct messages with materialized inbox state."""
+from django.db import transaction as db_transaction
+from django.db.models import F
+
+from .models import DirectMessage, DirectThread, DirectThreadState
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+def ensure_thread_states(thread):
+    DirectThreadState.objects.bulk_create(
+        [
+            DirectThreadState(thread=thread, user_id=thread.teacher_id, last_message_at=thread.created_at),
+            DirectThreadState(thread=thread, user_id=thread.student_id, last_message_at=thread.created_at),
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def get_or_create_thread(teacher, student, course=None):
+    thread, created = DirectThread.objects.get_or_create(course=course, teacher=teacher, student=student)
+    if created:
+        ensure_thread_states(thread)
+    return thread
+
+
+def send_direct_message(thread, sender, text):
+    """Store a message and update both participants' inbox rows in the same transaction."""
+    if sender.pk not in (thread.teacher_id, thread.student_id):
+        raise ValueError("Only thread participants can send messages")
+    recipient_id = thread.student_id if sender.pk == thread.teacher_id else thread.teacher_id
+
+    with db_transaction.atomic():
+        message = DirectMessage.objects.create(thread=thread, sender=sender, text=text[:MAX_MESSAGE_LENGTH])
+        pointer = {"last_message": message, "last_message_at": message.created_at}
+        updated = DirectThreadState.objects.filter(thread=thread, user_id=sender.pk).update(
+            last_read_message_id=message.pk, **pointer
+        )
+        if not updated:
+            # Thread created before inbox states existed.
+            ensure_thread_states(thread)
+            DirectThreadState.objects.filter(thread=thread, user_id=sender.pk).update(
+                last_read_message_id=message.pk, **pointer
+            )
+        DirectThreadState.objects.filter(thread=thread, user_id=recipient_id).update(
+            unread_count=F("unread_count") + 1, **pointer
+        )
+    return message
+
+
+def mark_thread_read(thread, user):
+    DirectThreadState.objects.filter(thread=thread, user=user, unread_count__gt=0).update(
+        unread_count=0, last_read_message_id=F("last_message_id")
+    )
+
+
+def inbox(user):
+    """The user's threads, most recently active first (one query when evaluated)."""
+    return (
+        DirectThreadState.objects.filter(user=user)
+        .select_related("thread__teacher", "thread__student", "thread__course", "last_message")
+        .order_by("-last_message_at", "-id")
+    )
+
+
+def thread_json(state, user):
+    thread = state.thread
+    other = thread.student if thread.teacher_id == user.pk else thread.teacher
+    last = state.last_message
+    return {
+        "thread_id": thread.pk,
+        "course": {"id": thread.course_id, "title": thread.course.title} if thread.course_id else None,
+        "with": {"id": other.pk, "name": other.display_name or other.username},
+        "unread_count": state.unread_count,
+        "last_read_message_id": state.last_read_message_id,
+        "last_message": {
+            "id": last.pk,
+            "sender_id": last.sender_id,
+            "text": last.text[:200],
+            "created_at": last.created_at,
+        } if last else None,
+        "last_message_at": state.last_message_at,
+    }
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:32
+#
+# Besides the rating aggregates, makemigrations picked up model state that the
+# baseline migrations never recorded for the chat models (DirectThread,
+# DirectMessage, CourseGroupMessage options, FKs and unique_together).
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Review = apps.get_model("courses", "Review")
+    totals = Review.objects.values("course_id").annotate(n=models.Count("id"), total=models.Sum("rating"))
+    for row in totals:
+        Course.objects.filter(pk=row["course_id"]).update(rating_count=row["n"], rating_sum=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_preview_and_chat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='coursegroupmessage',
+            options={'ordering': ('created_at',)},
+        ),
+        migrations.AlterModelOptions(
+            name='directmessage',
+            options={'ordering': ('created_at',)},
+        ),
+        migrations.AlterUniqueTogether(
+            name='directthread',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='coursegroupmessage',
+            name='text',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='directmessage',
+            name='text',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='directthread',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='direct_threads_as_student', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='directthread',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='direct_threads_as_teacher', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='directthread',
+            unique_together={('course', 'teacher', 'student')},
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from courses import search
+
+    if not search.create_fts_table(schema_editor.connection):
+        return
+    Course = apps.get_model("courses", "Course")
+    CoursePart = apps.get_model("courses", "CoursePart")
+    names = {}
+    for course_id, name in CoursePart.objects.values_list("course_id", "name"):
+        names.setdefault(course_id, []).append(name)
+    rows = [
+        (
+            c.pk,
+            search.normalize_text(c.title),
+            search.normalize_text(c.description),
+            search.normalize_text(c.subject),
+            search.normalize_text(" ".join(names.get(c.pk, []))),
+        )
+        for c in Course.objects.all()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {search.FTS_TABLE} (rowid, title, description, subject, parts) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    from courses import search
+
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0003_course_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
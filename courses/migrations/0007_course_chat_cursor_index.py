@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lesson_completion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursegroupmessage',
+            index=models.Index(fields=['course', 'created_at', 'id'], name='course_chat_cursor_idx'),
+        ),
+    ]
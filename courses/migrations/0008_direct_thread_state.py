@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_thread_states(apps, schema_editor):
+    DirectThread = apps.get_model("courses", "DirectThread")
+    DirectMessage = apps.get_model("courses", "DirectMessage")
+    DirectThreadState = apps.get_model("courses", "DirectThreadState")
+    states = []
+    for thread in DirectThread.objects.all():
+        last = DirectMessage.objects.filter(thread=thread).order_by("-created_at", "-id").first()
+        for user_id in (thread.teacher_id, thread.student_id):
+            states.append(DirectThreadState(
+                thread=thread,
+                user_id=user_id,
+                last_message=last,
+                last_message_at=last.created_at if last else thread.created_at,
+                last_read_message_id=last.pk if last else 0,
+            ))
+    DirectThreadState.objects.bulk_create(states, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_chat_cursor_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectThreadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.directmessage')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='states', to='courses.directthread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_message_at', '-id'], name='inbox_user_recent_idx')],
+                'unique_together': {('thread', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_thread_states, migrations.RunPython.noop),
+    ]
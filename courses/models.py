@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 
 User = settings.AUTH_USER_MODEL
@@ -12,12 +13,24 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    # Denormalized review aggregates, kept in sync by the Review signals
+    # (courses.signals); rebuild_course_ratings recomputes them from scratch.
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the active catalog (courses.api)
+            models.Index(fields=["is_active", "-created_at", "-id"], name="course_active_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
     def average_rating(self):
-        agg = self.reviews.aggregate(models.Avg("rating"))
-        return agg["rating__avg"] or 0
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
 
 class CoursePart(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="parts")
@@ -66,6 +79,44 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.student} -> {self.part}"
 
+class LessonCompletion(models.Model):
+    """A student finished a lesson. Written in batches by courses.progress."""
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="lesson_completions")
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="completions")
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("student", "lesson")
+
+    def __str__(self):
+        return f"{self.student} ✓ {self.lesson}"
+
+class CourseRecommendation(models.Model):
+    """Top-K "also bought" neighbours of a course, written by courses.recommendations."""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="recommendations")
+    recommended = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ("course", "rank")
+
+    def __str__(self):
+        return f"{self.course} -> {self.recommended} ({self.score:.3f})"
+
+class RecommendationBuild(models.Model):
+    """One run of the recommendation batch job; the latest one is the incremental high-water mark."""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    last_enrollment_id = models.BigIntegerField(default=0)
+    full = models.BooleanField(default=False)
+    courses_refreshed = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{'full' if self.full else 'incremental'} build @ {self.started_at:%Y-%m-%d %H:%M}"
+
 class Review(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="reviews")
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="course_reviews")
@@ -90,6 +141,10 @@ class CourseGroupMessage(models.Model):
 
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            # incremental fetch: WHERE course_id = ? AND (created_at, id) > cursor
+            models.Index(fields=["course", "created_at", "id"], name="course_chat_cursor_idx"),
+        ]
 
     def __str__(self):
         return f"{self.course} - {self.user}"
@@ -121,3 +176,27 @@ class DirectMessage(models.Model):
 
     def __str__(self):
         return f"{self.sender}"
+
+
+class DirectThreadState(models.Model):
+    """Per-participant inbox row for a DirectThread, maintained by courses.messaging.
+
+    Keeps the last-message pointer and unread counter materialized so an
+    inbox is a single indexed query over this table.
+    """
+
+    thread = models.ForeignKey(DirectThread, on_delete=models.CASCADE, related_name="states")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="thread_states")
+    last_message = models.ForeignKey(DirectMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_read_message_id = models.BigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("thread", "user")
+        indexes = [
+            models.Index(fields=["user", "-last_message_at", "-id"], name="inbox_user_recent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.thread} ({self.unread_count} unread)"
@@ -0,0 +1,70 @@
+"""Per-user set of enrolled CoursePart ids.
+
+The ids are cached as two sorted tuples (paid and trial) under one key per
+user, so a course page needs at most one Enrollment query to know the state
+of every part, and membership checks in views and templates are O(1).
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Enrollment
+
+OWNED, TRIAL, LOCKED = "owned", "trial", "locked"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(user_id):
+    return f"user:{user_id}:enrolled-parts"
+
+
+class PartOwnership:
+    __slots__ = ("owned", "trial")
+
+    def __init__(self, owned=(), trial=()):
+        self.owned = frozenset(owned)
+        self.trial = frozenset(trial)
+
+    def state(self, part_id):
+        if part_id in self.owned:
+            return OWNED
+        if part_id in self.trial:
+            return TRIAL
+        return LOCKED
+
+    def owns(self, part_id):
+        return part_id in self.owned
+
+
+EMPTY = PartOwnership()
+
+
+def _load(user_id):
+    owned, trial = [], []
+    for part_id, is_trial in Enrollment.objects.filter(student_id=user_id).values_list("part_id", "is_trial"):
+        (trial if is_trial else owned).append(part_id)
+    return tuple(sorted(owned)), tuple(sorted(trial))
+
+
+def get_part_ownership(user):
+    """Ownership index for ``user``; memoized on the user object for the request."""
+    if not user.is_authenticated:
+        return EMPTY
+    ownership = getattr(user, "_part_ownership", None)
+    if ownership is None:
+        key = _cache_key(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = _load(user.pk)
+            cache.set(key, ids, CACHE_TIMEOUT)
+        ownership = user._part_ownership = PartOwnership(*ids)
+    return ownership
+
+
+def forget_part_ownership(user_id):
+    """Drop the cached set once the current transaction commits.
+
+    Deleting (rather than patching the cached tuples) can't lose an
+    enrollment to two concurrent purchases; the next request reloads it
+    with one query.
+    """
+    transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
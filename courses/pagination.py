@@ -0,0 +1,57 @@
+"""Keyset ("seek") pagination helpers shared by the JSON endpoints.
+
+A cursor is an opaque, URL-safe token holding the ``(created_at, id)`` of
+the last row a client has seen. Paging with it stays an indexed range
+scan no matter how deep the client goes, unlike OFFSET pagination.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(created_at, id)`` from a cursor token or raise InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if created_at is None:
+        raise InvalidCursor("Invalid cursor")
+    return created_at, pk
+
+
+def older_than(created_at, pk, field="created_at"):
+    """Rows after the cursor when ordering by ``(-field, -id)``."""
+    return Q(**{f"{field}__lt": created_at}) | Q(**{field: created_at, "id__lt": pk})
+
+
+def newer_than(created_at, pk, field="created_at"):
+    """Rows after the cursor when ordering by ``(field, id)``."""
+    return Q(**{f"{field}__gt": created_at}) | Q(**{field: created_at, "id__gt": pk})
+
+
+def keyset_page(queryset, limit, field="created_at"):
+    """Evaluate one page (queryset must already be ordered and filtered past the cursor).
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    rows = list(queryset[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.pk)
@@ -0,0 +1,167 @@
+"""Write-behind buffer for lesson completions.
+
+Marking a lesson complete only touches process memory. Every
+``LESSON_PROGRESS_FLUSH_SECONDS`` (or sooner when the buffer gets large)
+the buffer is flushed in one transaction: the completions are inserted with
+a single bulk_create, per-part lesson counts and per-student completion
+counts come from two grouped queries, and each affected Enrollment gets one
+UPDATE of ``progress_percent``, however many lessons were clicked.
+
+The buffer is per worker process. It is flushed by a timer thread, when it
+fills up, and at interpreter exit; a hard crash can lose at most one
+interval of clicks. Completions whose lesson or student was deleted in the
+meantime are dropped at flush time. A flush that fails anyway is put back
+and retried on the next one, and the failure is logged rather than raised
+into the request or the timer thread.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction as db_transaction
+from django.db.models import Count
+
+from .models import Enrollment, Lesson, LessonCompletion
+
+FLUSH_MAX_PENDING = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (student_id, part_id) -> {lesson_id, ...}
+        self._size = 0
+        self._timer = None
+
+    def add(self, student_id, part_id, lesson_id):
+        """Buffer a completion; returns True when the buffer should be flushed now."""
+        with self._lock:
+            lessons = self._pending.setdefault((student_id, part_id), set())
+            if lesson_id not in lessons:
+                lessons.add(lesson_id)
+                self._size += 1
+            if self._timer is None:
+                self._timer = threading.Timer(settings.LESSON_PROGRESS_FLUSH_SECONDS, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return self._size >= FLUSH_MAX_PENDING
+
+    def contains(self, student_id, part_id, lesson_id):
+        with self._lock:
+            return lesson_id in self._pending.get((student_id, part_id), ())
+
+    def restore(self, pending):
+        """Put back entries from a flush that failed."""
+        for (student_id, part_id), lesson_ids in pending.items():
+            for lesson_id in lesson_ids:
+                self.add(student_id, part_id, lesson_id)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return pending
+
+    def _timed_flush(self):
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing lesson completions failed; they will be retried.")
+        finally:
+            close_old_connections()
+
+
+_buffer = ProgressBuffer()
+
+
+def record_completion(student, lesson):
+    if _buffer.add(student.pk, lesson.part_id, lesson.pk):
+        try:
+            flush()
+        except Exception:
+            # The completion is back in the buffer; don't fail the student's request.
+            logger.exception("Flushing lesson completions failed; they will be retried.")
+
+
+def is_completed(student, lesson):
+    if _buffer.contains(student.pk, lesson.part_id, lesson.pk):
+        return True
+    return LessonCompletion.objects.filter(student=student, lesson=lesson).exists()
+
+
+def flush():
+    """Write buffered completions and refresh progress of the affected enrollments."""
+    pending = _buffer.drain()
+    if not pending:
+        return 0
+
+    try:
+        _write(pending)
+    except Exception:
+        _buffer.restore(pending)
+        raise
+    return len(pending)
+
+
+def _existing(pending):
+    """``pending`` without completions whose lesson (or its part) or student is gone."""
+    lesson_parts = dict(
+        Lesson.objects.filter(pk__in={lesson_id for lesson_ids in pending.values() for lesson_id in lesson_ids})
+        .values_list("id", "part_id")
+    )
+    students = set(
+        get_user_model().objects.filter(pk__in={student_id for student_id, _ in pending}).values_list("pk", flat=True)
+    )
+    kept = {}
+    for (student_id, part_id), lesson_ids in pending.items():
+        if student_id not in students:
+            continue
+        lesson_ids = {lesson_id for lesson_id in lesson_ids if lesson_parts.get(lesson_id) == part_id}
+        if lesson_ids:
+            kept[(student_id, part_id)] = lesson_ids
+    return kept
+
+
+def _write(pending):
+    pending = _existing(pending)
+    if not pending:
+        return
+    student_ids = {student_id for student_id, _ in pending}
+    part_ids = {part_id for _, part_id in pending}
+    with db_transaction.atomic():
+        LessonCompletion.objects.bulk_create(
+            [
+                LessonCompletion(student_id=student_id, lesson_id=lesson_id)
+                for (student_id, _), lesson_ids in pending.items()
+                for lesson_id in lesson_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+        totals = dict(
+            Lesson.objects.filter(part_id__in=part_ids)
+            .values("part_id")
+            .annotate(n=Count("id"))
+            .values_list("part_id", "n")
+        )
+        done = {
+            (row["student_id"], row["lesson__part_id"]): row["n"]
+            for row in LessonCompletion.objects.filter(student_id__in=student_ids, lesson__part_id__in=part_ids)
+            .values("student_id", "lesson__part_id")
+            .annotate(n=Count("id"))
+        }
+
+        for key in pending:
+            total = totals.get(key[1], 0)
+            percent = min(100, done.get(key, 0) * 100 // total) if total else 0
+            Enrollment.objects.filter(student_id=key[0], part_id=key[1]).update(progress_percent=percent)
+
+
+atexit.register(flush)
@@ -0,0 +1,201 @@
+"""Item-item "students who bought this also bought" recommendations.
+
+The batch job reads Enrollment rows in id-ordered chunks into NumPy arrays,
+builds a binary student × course matrix in CSR form (rows sorted by
+student), expands each student's row into course pairs, counts pair
+co-occurrences and scores them with cosine similarity:
+
+    sim(i, j) = |students(i) ∩ students(j)| / sqrt(|students(i)| · |students(j)|)
+
+The top K neighbours per course are stored in CourseRecommendation, so the
+request path is a single indexed read. Incremental runs recompute only the
+courses that gained enrollments since the previous build and the courses
+that share a student with them.
+"""
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max
+
+from .models import Course, CourseRecommendation, Enrollment, RecommendationBuild
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+TOP_K = 10
+CHUNK_SIZE = 100_000
+# Very large baskets (bulk buyers, staff test accounts) add k² pairs and little signal.
+MAX_BASKET = 200
+
+
+# ---- request path ----
+
+def recommended_for_course(course, limit=6):
+    return [
+        r.recommended
+        for r in CourseRecommendation.objects.filter(course=course, recommended__is_active=True)
+        .select_related("recommended")
+        .order_by("rank")[:limit]
+    ]
+
+
+def recommended_for_student(user, limit=6):
+    """Best neighbours of the courses the student is enrolled in, minus those courses."""
+    enrolled = Enrollment.objects.filter(student=user).values("part__course_id")
+    best = (
+        CourseRecommendation.objects.filter(course_id__in=enrolled, recommended__is_active=True)
+        .exclude(recommended_id__in=enrolled)
+        .values("recommended_id")
+        .annotate(score=Max("score"))
+        .order_by("-score")[:limit]
+    )
+    ids = [row["recommended_id"] for row in best]
+    courses = Course.objects.in_bulk(ids)
+    return [courses[pk] for pk in ids if pk in courses]
+
+
+# ---- batch job ----
+
+def _load_pairs(enrollments, chunk_size):
+    """(student_id, course_id) arrays read in id-ordered chunks, deduplicated."""
+    students, courses = [], []
+    last_id = 0
+    while True:
+        chunk = list(
+            enrollments.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "student_id", "part__course_id")[:chunk_size]
+        )
+        if not chunk:
+            break
+        arr = np.array(chunk, dtype=np.int64)
+        students.append(arr[:, 1])
+        courses.append(arr[:, 2])
+        last_id = int(arr[-1, 0])
+    if not students:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    pairs = np.unique(np.stack([np.concatenate(students), np.concatenate(courses)], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _csr(student_ids, course_idx):
+    """Row pointer for the student × course matrix; input is sorted by student."""
+    _, row_lengths = np.unique(student_ids, return_counts=True)
+    indptr = np.zeros(len(row_lengths) + 1, dtype=np.int64)
+    np.cumsum(row_lengths, out=indptr[1:])
+    return indptr, row_lengths
+
+
+def _cooccurrence(indptr, row_lengths, course_idx, n_courses, targets=None):
+    """Count ordered (i, j) course pairs sharing a student, i != j.
+
+    Returns (i, j, count) arrays. ``targets`` (bool mask over courses)
+    restricts the left-hand course, for incremental runs.
+    """
+    keep = row_lengths <= MAX_BASKET
+    lengths = np.where(keep, row_lengths, 0)
+    starts = indptr[:-1]
+
+    # For every non-zero entry e of row r: repeat it len(r) times, pairing it
+    # with each entry of the same row.
+    entry_row = np.repeat(np.arange(len(row_lengths)), row_lengths)
+    entry_len = lengths[entry_row]
+    left = np.repeat(np.arange(len(course_idx)), entry_len)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(entry_len) - entry_len, entry_len)
+    right = starts[entry_row[left]] + offsets
+
+    i = course_idx[left]
+    j = course_idx[right]
+    mask = i != j
+    if targets is not None:
+        mask &= targets[i]
+    keys, counts = np.unique(i[mask] * n_courses + j[mask], return_counts=True)
+    return keys // n_courses, keys % n_courses, counts
+
+
+def _top_k(i, j, scores, k):
+    order = np.lexsort((-scores, i))
+    i, j, scores = i[order], j[order], scores[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(i)) + 1]
+    group_len = np.diff(np.r_[group_start, len(i)])
+    rank = np.arange(len(i)) - np.repeat(group_start, group_len)
+    keep = rank < k
+    return i[keep], j[keep], scores[keep], rank[keep]
+
+
+def build_recommendations(full=False, top_k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Run the batch job; returns the RecommendationBuild row it recorded."""
+    if np is None:
+        raise RuntimeError("NumPy is required to build recommendations (pip install numpy).")
+
+    previous = RecommendationBuild.objects.order_by("-pk").first()
+    high_water = Enrollment.objects.aggregate(m=Max("pk"))["m"] or 0
+    enrollments = Enrollment.objects.filter(pk__lte=high_water)
+
+    if full or previous is None:
+        full = True
+        changed = None
+    else:
+        changed = list(
+            enrollments.filter(pk__gt=previous.last_enrollment_id)
+            .values_list("part__course_id", flat=True)
+            .distinct()
+        )
+        if not changed:
+            return RecommendationBuild.objects.create(last_enrollment_id=high_water)
+        # A new enrollment in course i changes sim(i, j) for every course j sharing
+        # a student with i, so those neighbours' lists are rebuilt as well. Their
+        # rows need all of their students, not just the ones connected to i.
+        connected = enrollments.filter(
+            student_id__in=enrollments.filter(part__course_id__in=changed).values("student_id")
+        )
+        changed = list(connected.values_list("part__course_id", flat=True).distinct())
+        enrollments = enrollments.filter(
+            student_id__in=enrollments.filter(part__course_id__in=changed).values("student_id")
+        )
+
+    student_ids, course_ids = _load_pairs(enrollments, chunk_size)
+    course_keys, course_idx = np.unique(course_ids, return_inverse=True)
+    n_courses = len(course_keys)
+
+    if full:
+        # Column norms of the binary matrix: distinct students per course.
+        degree = np.bincount(course_idx, minlength=n_courses).astype(np.float64)
+    else:
+        # The loaded rows only cover students of changed courses, so take norms from the whole table.
+        lookup = dict(
+            Enrollment.objects.filter(pk__lte=high_water)
+            .values("part__course_id")
+            .annotate(n=Count("student_id", distinct=True))
+            .values_list("part__course_id", "n")
+        )
+        degree = np.array([lookup.get(c, 0) for c in course_keys.tolist()], dtype=np.float64)
+
+    targets = None
+    if changed is not None:
+        targets = np.isin(course_keys, np.array(changed, dtype=np.int64))
+
+    if n_courses:
+        indptr, row_lengths = _csr(student_ids, course_idx)
+        i, j, counts = _cooccurrence(indptr, row_lengths, course_idx, n_courses, targets)
+        scores = counts / np.sqrt(degree[i] * degree[j])
+        i, j, scores, rank = _top_k(i, j, scores, top_k)
+    else:
+        i = j = rank = np.empty(0, dtype=np.int64)
+        scores = np.empty(0)
+
+    refreshed = course_keys.tolist() if full else changed
+    rows = [
+        CourseRecommendation(course_id=c, recommended_id=r, score=float(s), rank=int(k))
+        for c, r, s, k in zip(course_keys[i].tolist(), course_keys[j].tolist(), scores.tolist(), rank.tolist())
+    ]
+    with db_transaction.atomic():
+        if full:
+            CourseRecommendation.objects.all().delete()
+        else:
+            CourseRecommendation.objects.filter(course_id__in=changed).delete()
+        CourseRecommendation.objects.bulk_create(rows, batch_size=1000)
+        return RecommendationBuild.objects.create(
+            last_enrollment_id=high_water, full=full, courses_refreshed=len(refreshed)
+        )
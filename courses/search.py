@@ -0,0 +1,205 @@
+"""Course full-text search.
+
+On SQLite builds with FTS5 we keep a trigram-tokenized shadow table
+(``courses_course_fts``) whose rowid is the Course id. Trigrams give us
+substring matching that works the same for Latin, Cyrillic and Uzbek
+Latin text, and FTS5's bm25() ranks the hits. Without FTS5 (or on another
+database) we fall back to plain ORM ``icontains`` filters.
+"""
+import unicodedata
+
+from django.db import OperationalError, connections
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Course, CoursePart
+
+FTS_TABLE = "courses_course_fts"
+MIN_TERM_LENGTH = 3  # trigram tokenizer can't match anything shorter
+SEARCH_RESULT_LIMIT = 200
+# FTS hits read per page, as a multiple of the limit, before filtering by ``courses``.
+FTS_OVERFETCH = 4
+
+# bm25() column weights, in table column order: title, description, subject, parts
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+
+# Uzbek Latin is written with several look-alike apostrophes (oʻ, o‘, o', o’),
+# and Russian text mixes ё/е freely.
+_FOLD = str.maketrans({
+    "ʻ": "'",  # ʻ modifier letter turned comma
+    "ʼ": "'",  # ʼ modifier letter apostrophe
+    "‘": "'",
+    "’": "'",
+    "`": "'",
+    "´": "'",
+    "ё": "е",
+    "Ё": "Е",
+})
+
+_APOSTROPHES = [chr(code) for code, folded in _FOLD.items() if folded == "'"]
+
+_available = {}
+
+
+def normalize_text(text):
+    """Fold the spelling variants we don't want to distinguish when searching."""
+    return unicodedata.normalize("NFKC", text or "").translate(_FOLD)
+
+
+def fts_available(using="default"):
+    """True when the FTS5 shadow table exists on this connection."""
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def create_fts_table(connection):
+    """Create the FTS5 table; returns False when SQLite lacks FTS5/trigram support."""
+    if connection.vendor != "sqlite":
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(title, description, subject, parts, tokenize='trigram')"
+            )
+    except OperationalError:
+        return False
+    _available.pop(connection.alias, None)
+    return True
+
+
+def _document(course, part_names):
+    return (
+        course.pk,
+        normalize_text(course.title),
+        normalize_text(course.description),
+        normalize_text(course.subject),
+        normalize_text(" ".join(part_names)),
+    )
+
+
+def index_course(course):
+    """(Re)index a single course together with its part names."""
+    if not fts_available():
+        return
+    part_names = CoursePart.objects.filter(course_id=course.pk).values_list("name", flat=True)
+    with connections["default"].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [course.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, subject, parts) VALUES (%s, %s, %s, %s, %s)",
+            _document(course, part_names),
+        )
+
+
+def unindex_course(course_id):
+    if not fts_available():
+        return
+    with connections["default"].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [course_id])
+
+
+def rebuild_index(chunk_size=2000):
+    """Rebuild the whole FTS table from scratch. Returns the number of indexed courses."""
+    if not fts_available():
+        return 0
+    indexed = 0
+    with connections["default"].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        last_id = 0
+        while True:
+            chunk = list(
+                Course.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .only("id", "title", "description", "subject")[:chunk_size]
+            )
+            if not chunk:
+                break
+            names = {}
+            for course_id, name in CoursePart.objects.filter(course__in=chunk).values_list("course_id", "name"):
+                names.setdefault(course_id, []).append(name)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, subject, parts) VALUES (%s, %s, %s, %s, %s)",
+                [_document(course, names.get(course.pk, [])) for course in chunk],
+            )
+            indexed += len(chunk)
+            last_id = chunk[-1].pk
+    return indexed
+
+
+def _terms(query):
+    return [t for t in normalize_text(query).split() if t]
+
+
+def _match_expression(terms):
+    # Quote every term so FTS5 query syntax (AND/OR/NEAR, *, ^, ...) in user input is inert.
+    return " ".join('"%s"' % t.replace('"', '""') for t in terms)
+
+
+def search_courses(query, courses=None, limit=SEARCH_RESULT_LIMIT):
+    """Filter ``courses`` by ``query``, best matches first.
+
+    Uses the FTS5 index when possible; terms shorter than three characters
+    can't be served by the trigram index, so such queries use the ORM path.
+    """
+    if courses is None:
+        courses = Course.objects.all()
+    terms = _terms(query)
+    if not terms:
+        return courses
+
+    long_terms = [t for t in terms if len(t) >= MIN_TERM_LENGTH]
+    if long_terms and len(long_terms) == len(terms) and fts_available():
+        ids = _ranked_ids(_match_expression(long_terms), courses, limit)
+        if not ids:
+            return courses.none()
+        rank = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+        return courses.filter(pk__in=ids).order_by(rank)
+
+    for term in terms:
+        match = Q()
+        for spelling in _spellings(term):
+            match |= (
+                Q(title__icontains=spelling)
+                | Q(description__icontains=spelling)
+                | Q(subject__icontains=spelling)
+                | Q(parts__name__icontains=spelling)
+            )
+        courses = courses.filter(match)
+    return courses.distinct().order_by("-created_at")
+
+
+def _ranked_ids(expression, courses, limit):
+    """Best ``limit`` FTS hits that are also in ``courses``, in bm25 order.
+
+    Hits are read in pages of ``limit * FTS_OVERFETCH`` and filtered against
+    ``courses`` before cutting, so inactive or filtered-out courses don't use
+    up the limit.
+    """
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    page_size = limit * FTS_OVERFETCH
+    ids, offset = [], 0
+    with connections["default"].cursor() as cursor:
+        while len(ids) < limit:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [expression, page_size, offset],
+            )
+            page = [row[0] for row in cursor.fetchall()]
+            allowed = set(courses.filter(pk__in=page).values_list("pk", flat=True))
+            ids += [pk for pk in page if pk in allowed]
+            if len(page) < page_size:
+                break
+            offset += page_size
+    return ids[:limit]
+
+
+def _spellings(term):
+    # The ORM path compares against unfolded columns, so try each apostrophe the
+    # folded "'" may have been stored as.
+    if "'" not in term:
+        return [term]
+    return [term] + [term.replace("'", quote) for quote in _APOSTROPHES]
@@ -1,13 +1,48 @@
 from decimal import Decimal
 from wallet.models import Transaction
-from .models import Enrollment
-from django.db import transaction as db_transaction
-from wallet.models import ZCOIN_RATE_UZS
+from .models import Course, Enrollment, Review
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from wallet import ledger, operations as wallet_ops, rates
+from wallet.services import handle_first_zcoin_purchase
+from .ownership import forget_part_ownership
 
 PLATFORM_COMMISSION = Decimal("0.10")  # 10%
 ENROLL_XP_REWARD = 50  # xp for buying a part
 
+
+class AlreadyOwned(ValueError):
+    pass
+
+
+def _claim_enrollment(student, part):
+    """Create the paid Enrollment (or upgrade a trial) before any money moves.
+
+    The conditional trial UPDATE and the (student, part) unique constraint make
+    this the race point: of two concurrent purchases only one gets past it, and
+    the other raises AlreadyOwned without debiting anything.
+    """
+    upgraded = Enrollment.objects.filter(student=student, part=part, is_trial=True).update(is_trial=False)
+    if upgraded:
+        forget_part_ownership(student.pk)
+        return Enrollment.objects.get(student=student, part=part)
+    try:
+        with db_transaction.atomic():
+            return Enrollment.objects.create(student=student, part=part, is_trial=False, progress_percent=0)
+    except IntegrityError:
+        raise AlreadyOwned("You already own this part.")
+
 def purchase_course_part(student, part):
+    """Buy ``part`` for ``student`` in one database transaction.
+
+    Missing Z coins are auto-converted from the UZS balance first. Every balance
+    change is a conditional UPDATE (see wallet.operations), so concurrent
+    purchases can neither overdraw a wallet nor lose a credit; any failure rolls
+    back the conversion as well. The Enrollment is claimed first, so a part that
+    is already paid for raises AlreadyOwned before anything is charged; a trial
+    enrollment is upgraded in place.
+    """
     if student.role != "student":
         raise ValueError("Only students can purchase course parts")
 
@@ -16,54 +51,99 @@ def purchase_course_part(student, part):
     teacher_wallet = teacher.wallet
 
     price_z = part.price_z
-    # UX improvement: if student doesn't have enough Z, auto-convert from UZS when possible.
-    if student_wallet.balance_z < price_z:
-        needed_z = price_z - student_wallet.balance_z
-        needed_uzs = (needed_z * ZCOIN_RATE_UZS).quantize(Decimal("0.01"))
-        if student_wallet.balance_uzs < needed_uzs:
-            raise ValueError("Not enough funds. Top up your wallet or buy more Z.")
-        # Convert only the required amount.
-        converted_z = student_wallet.convert_uzs_to_z(needed_uzs)
-        Transaction.objects.create(
-            user=student,
-            wallet=student_wallet,
-            type="convert_to_z",
-            amount_uzs=-needed_uzs,
-            amount_z=converted_z,
-            description=f"Auto-convert to complete purchase for {part}",
-        )
-
     commission_z = (price_z * PLATFORM_COMMISSION).quantize(Decimal("0.01"))
     teacher_z = price_z - commission_z
 
     with db_transaction.atomic():
-        student_wallet.spend_z(price_z)
+        enrollment = _claim_enrollment(student, part)
+        try:
+            wallet_ops.debit(student_wallet, z=price_z)
+        except wallet_ops.InsufficientFunds:
+            # UX improvement: if student doesn't have enough Z, auto-convert from UZS when possible.
+            student_wallet.refresh_from_db(fields=["balance_z", "balance_uzs"])
+            needed_z = price_z - student_wallet.balance_z
+            rate = rates.current_rate()
+            needed_uzs = rates.uzs_needed_for(needed_z, rate)
+            try:
+                # Convert only the required amount.
+                converted_z = wallet_ops.convert_uzs_to_z(student_wallet, needed_uzs, rate=rate)
+                wallet_ops.debit(student_wallet, z=price_z)
+            except wallet_ops.InsufficientFunds:
+                raise wallet_ops.InsufficientFunds("Not enough funds. Top up your wallet or buy more Z.")
+            Transaction.objects.create(
+                user=student,
+                wallet=student_wallet,
+                type="convert_to_z",
+                amount_uzs=-needed_uzs,
+                amount_z=converted_z,
+                rate_uzs=rate,
+                description=f"Auto-convert to complete purchase for {part}",
+            )
+            ledger.post(
+                "convert_to_z",
+                ledger.conversion_lines(student_wallet, needed_uzs, converted_z),
+                description=f"Auto-convert for {part}",
+            )
+            handle_first_zcoin_purchase(student, converted_z)
+
         Transaction.objects.create(
             user=student,
             wallet=student_wallet,
             type="course_purchase",
             amount_z=-price_z,
             description=f"Purchase {part}",
+            course_part=part,
         )
 
-        teacher_wallet.credit_z(teacher_z)
+        teacher_account = wallet_ops.accrue_earning(teacher_wallet, teacher_z)
         Transaction.objects.create(
             user=teacher,
             wallet=teacher_wallet,
             type="course_purchase",
             amount_z=teacher_z,
             description=f"Earned from {student.username} for {part}",
+            course_part=part,
         )
-
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=student,
-            part=part,
-            defaults={"is_trial": False, "progress_percent": 0},
+        ledger.post(
+            "course_purchase",
+            [
+                (ledger.wallet_code(student_wallet), -price_z),
+                (teacher_account, teacher_z),
+                (ledger.PLATFORM_REVENUE_Z, commission_z),
+            ],
+            description=f"{student.username} bought {part}",
         )
 
         # reward XP for commitment
-        from accounts.models import User  # local import
-        student.xp += ENROLL_XP_REWARD
-        student.save()
+        from accounts.leaderboard import award_xp  # local import
+        award_xp(student, ENROLL_XP_REWARD, subject=part.course.subject)
 
     return enrollment
+
+
+def save_review(course, student, rating, comment=""):
+    """Create or update a student's review.
+
+    The Course rating aggregates are refreshed by the Review signals in
+    courses.signals, so admin edits and deletes stay in sync too.
+    """
+    return Review.objects.update_or_create(
+        course=course,
+        student=student,
+        defaults={"rating": rating, "comment": comment},
+    )
+
+
+def rebuild_rating_aggregates(courses=None):
+    """Recompute rating_count/rating_sum from Review rows in a single UPDATE."""
+    if courses is None:
+        courses = Course.objects.all()
+    reviews = Review.objects.filter(course=OuterRef("pk")).values("course")
+    return courses.update(
+        rating_count=Coalesce(
+            Subquery(reviews.annotate(n=Count("id")).values("n"), output_field=IntegerField()), 0
+        ),
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum("rating")).values("total"), output_field=IntegerField()), 0
+        ),
+    )
@@ -0,0 +1,82 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search
+from .chat import forget_chat_access
+from .cache import invalidate_course
+from .models import Course, CoursePart, Enrollment, Lesson, Review
+from .ownership import forget_part_ownership
+from .services import rebuild_rating_aggregates
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course_on_delete(sender, instance, **kwargs):
+    search.unindex_course(instance.pk)
+
+
+@receiver(post_save, sender=CoursePart)
+@receiver(post_delete, sender=CoursePart)
+def reindex_course_on_part_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course = Course.objects.filter(pk=instance.course_id).first()
+    if course is not None:
+        search.index_course(course)
+
+
+# ---- course detail cache invalidation ----
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_on_course_change(sender, instance, **kwargs):
+    invalidate_course(instance.pk)
+
+
+@receiver(post_save, sender=CoursePart)
+@receiver(post_delete, sender=CoursePart)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_on_child_change(sender, instance, **kwargs):
+    invalidate_course(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_on_lesson_change(sender, instance, **kwargs):
+    course_id = CoursePart.objects.filter(pk=instance.part_id).values_list("course_id", flat=True).first()
+    invalidate_course(course_id)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def refresh_part_ownership(sender, instance, **kwargs):
+    forget_part_ownership(instance.student_id)
+    course_id = CoursePart.objects.filter(pk=instance.part_id).values_list("course_id", flat=True).first()
+    if course_id is not None:
+        forget_chat_access(course_id, instance.student_id)
+
+
+# ---- course rating aggregates ----
+
+@receiver(pre_save, sender=Review)
+def remember_reviewed_course(sender, instance, raw=False, **kwargs):
+    # A review moved to another course (admin edit) must also refresh the old one.
+    instance._previous_course_id = (
+        None if raw or instance.pk is None
+        else Review.objects.filter(pk=instance.pk).values_list("course_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_course_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_ids = {instance.course_id, getattr(instance, "_previous_course_id", None)} - {None}
+    rebuild_rating_aggregates(Course.objects.filter(pk__in=course_ids))
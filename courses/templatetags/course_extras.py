@@ -0,0 +1,9 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter(name="part_state")
+def part_state(ownership, part_id):
+    """{{ ownership|part_state:part.id }} -> "owned", "trial" or "locked"."""
+    return ownership.state(part_id)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = "courses"
 
@@ -8,4 +8,13 @@ urlpatterns = [
     path("<int:pk>/", views.course_detail, name="course_detail"),
     path("buy/<int:part_id>/", views.buy_part, name="buy_part"),
     path("<int:course_id>/review/", views.add_review, name="add_review"),
+    path("parts/<int:part_id>/start/", views.start_part, name="start_part"),
+    path("lessons/<int:lesson_id>/", views.lesson_detail, name="lesson_detail"),
+    path("lessons/<int:lesson_id>/complete/", views.complete_lesson, name="complete_lesson"),
+    path("api/catalog/", api.course_catalog, name="api_catalog"),
+    path("<int:course_id>/chat/", api.course_chat, name="course_chat"),
+    path("<int:course_id>/message-teacher/", views.message_teacher, name="message_teacher"),
+    path("inbox/", views.inbox, name="inbox"),
+    path("inbox/<int:thread_id>/", views.thread_detail, name="thread_detail"),
+    path("api/inbox/", api.inbox, name="api_inbox"),
 ]
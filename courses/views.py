@@ -1,34 +1,50 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Course, CoursePart, Enrollment, Review
-from .services import purchase_course_part
+from .models import Course, CoursePart, DirectThread, Enrollment, Lesson, Review
+from .services import purchase_course_part, save_review
+from .search import search_courses
+from .cache import cached_course_data, course_cache_version
+from .ownership import LOCKED, get_part_ownership
+from . import messaging, progress
+from .recommendations import recommended_for_course
 
 @login_required
 def course_list(request):
-    subject = request.GET.get("subject")
-    courses = Course.objects.filter(is_active=True)
-    if subject:
-        courses = courses.filter(subject__icontains=subject)
-    return render(request, "courses/course_list.html", {"courses": courses})
+    # "subject" is the pre-search query parameter; keep old links working.
+    query = (request.GET.get("q") or request.GET.get("subject") or "").strip()
+    courses = Course.objects.filter(is_active=True).select_related("teacher")
+    if query:
+        courses = search_courses(query, courses)
+    return render(request, "courses/course_list.html", {"courses": courses, "query": query})
 
 @login_required
 def course_detail(request, pk):
-    course = get_object_or_404(Course, pk=pk)
-    parts = course.parts.all()
+    course = get_object_or_404(Course.objects.select_related("teacher"), pk=pk)
+    version = course_cache_version(course.pk)
+    parts = cached_course_data(course.pk, version, "parts", lambda: list(course.parts.all()))
+    # Lazy: only evaluated when the cached reviews fragment is missing.
     reviews = course.reviews.select_related("student").order_by("-created_at")[:10]
     avg_rating = course.average_rating()
     return render(request, "courses/course_detail.html", {
         "course": course,
         "parts": parts,
+        "ownership": get_part_ownership(request.user),
         "reviews": reviews,
         "avg_rating": avg_rating,
+        "recommended": recommended_for_course(course),
+        "cache_version": version,
+        "cache_timeout": settings.COURSE_DETAIL_CACHE_TIMEOUT,
     })
 
 @login_required
 def buy_part(request, part_id):
     part = get_object_or_404(CoursePart, id=part_id)
     if request.method == "POST":
+        if get_part_ownership(request.user).owns(part.id):
+            messages.info(request, "You already own this part.")
+            return redirect("courses:course_detail", pk=part.course_id)
         try:
             purchase_course_part(request.user, part)
         except ValueError as e:
@@ -44,10 +60,82 @@ def add_review(request, course_id):
     if request.method == "POST":
         rating = int(request.POST.get("rating", 5))
         comment = request.POST.get("comment", "").strip()
-        review, created = Review.objects.update_or_create(
-            course=course,
-            student=request.user,
-            defaults={"rating": rating, "comment": comment},
-        )
+        review, created = save_review(course, request.user, rating, comment)
         messages.success(request, "Thank you for your feedback! Your opinion helps other learners.")
     return redirect("courses:course_detail", pk=course.id)
+
+
+def _can_open_lesson(user, lesson, state):
+    return lesson.is_preview or state != LOCKED or lesson.part.course.teacher_id == user.id
+
+@login_required
+def start_part(request, part_id):
+    lesson = Lesson.objects.filter(part_id=part_id).order_by("order", "id").first()
+    if lesson is None:
+        part = get_object_or_404(CoursePart, id=part_id)
+        messages.info(request, "This part has no lessons yet.")
+        return redirect("courses:course_detail", pk=part.course_id)
+    return redirect("courses:lesson_detail", lesson_id=lesson.id)
+
+@login_required
+def lesson_detail(request, lesson_id):
+    lesson = get_object_or_404(Lesson.objects.select_related("part__course"), id=lesson_id)
+    state = get_part_ownership(request.user).state(lesson.part_id)
+    if not _can_open_lesson(request.user, lesson, state):
+        messages.info(request, "Buy this part to open the lesson.")
+        return redirect("courses:course_detail", pk=lesson.part.course_id)
+    siblings = list(lesson.part.lessons.order_by("order", "id").values("id", "title", "lesson_type", "is_preview"))
+    ids = [s["id"] for s in siblings]
+    index = ids.index(lesson.id)
+    return render(request, "courses/lesson_detail.html", {
+        "lesson": lesson,
+        "part": lesson.part,
+        "siblings": siblings,
+        "next_id": ids[index + 1] if index + 1 < len(ids) else None,
+        "enrolled": state != LOCKED,
+        "completed": state != LOCKED and progress.is_completed(request.user, lesson),
+    })
+
+@login_required
+def complete_lesson(request, lesson_id):
+    lesson = get_object_or_404(Lesson.objects.only("id", "part_id"), id=lesson_id)
+    if request.method == "POST" and get_part_ownership(request.user).state(lesson.part_id) != LOCKED:
+        progress.record_completion(request.user, lesson)
+        next_id = request.POST.get("next")
+        if next_id and next_id.isdigit():
+            return redirect("courses:lesson_detail", lesson_id=int(next_id))
+    return redirect("courses:lesson_detail", lesson_id=lesson.id)
+
+
+@login_required
+def inbox(request):
+    states = list(messaging.inbox(request.user)[:100])
+    return render(request, "courses/inbox.html", {"states": states})
+
+@login_required
+def thread_detail(request, thread_id):
+    thread = get_object_or_404(
+        DirectThread.objects.select_related("teacher", "student", "course"), id=thread_id
+    )
+    if request.user.id not in (thread.teacher_id, thread.student_id):
+        return redirect("courses:inbox")
+
+    if request.method == "POST":
+        text = (request.POST.get("text") or "").strip()
+        if text:
+            messaging.send_direct_message(thread, request.user, text)
+        return redirect("courses:thread_detail", thread_id=thread.id)
+
+    messaging.mark_thread_read(thread, request.user)
+    history = list(thread.messages.order_by("-created_at", "-id")[:100])
+    history.reverse()
+    other = thread.student if thread.teacher_id == request.user.id else thread.teacher
+    return render(request, "courses/thread.html", {"thread": thread, "history": history, "other": other})
+
+@login_required
+def message_teacher(request, course_id):
+    course = get_object_or_404(Course, id=course_id)
+    if request.method != "POST" or course.teacher_id == request.user.id:
+        return redirect("courses:course_detail", pk=course.id)
+    thread = messaging.get_or_create_thread(course.teacher, request.user, course=course)
+    return redirect("courses:thread_detail", thread_id=thread.id)
@@ -98,6 +98,38 @@ DATABASES = {
     }
 }
 
+# -----------------------------------------------------------------------------
+# Cache
+# Local memory is per-process. To share cached pages between gunicorn workers use
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache (LOCATION=a dir)
+# or django.core.cache.backends.db.DatabaseCache (LOCATION=a table, run createcachetable).
+# -----------------------------------------------------------------------------
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "nok-default"),
+    }
+}
+COURSE_DETAIL_CACHE_TIMEOUT = int(os.environ.get("DJANGO_COURSE_DETAIL_CACHE_TIMEOUT", str(60 * 15)))
+
+# Lesson completions are buffered per worker and written at most this often (see courses.progress).
+LESSON_PROGRESS_FLUSH_SECONDS = int(os.environ.get("DJANGO_LESSON_PROGRESS_FLUSH_SECONDS", "30"))
+
+# Upper bound for course chat long-polling; each waiting request holds a worker.
+COURSE_CHAT_LONG_POLL_SECONDS = int(os.environ.get("DJANGO_COURSE_CHAT_LONG_POLL_SECONDS", "20"))
+
+# "immediate": course sales credit the teacher wallet inside the purchase.
+# "deferred": sales append PendingEarning rows and `manage.py settle_teacher_earnings`
+# moves them into the wallet, so a popular teacher's wallet row is not written per sale.
+TEACHER_EARNINGS_MODE = os.environ.get("DJANGO_TEACHER_EARNINGS_MODE", "immediate")
+
+# Shared secret for payment provider webhooks (HMAC-SHA256 of the body in X-Nok-Signature).
+# Webhooks are refused while it is empty, except with DEBUG on.
+PAYMENT_WEBHOOK_SECRET = os.environ.get("DJANGO_PAYMENT_WEBHOOK_SECRET", "")
+
+# How often each worker re-checks SitePaymentSettings for admin edits (wallet.site_settings).
+SITE_SETTINGS_RECHECK_SECONDS = float(os.environ.get("DJANGO_SITE_SETTINGS_RECHECK_SECONDS", "5"))
+
 # -----------------------------------------------------------------------------
 # Password validation
 # -----------------------------------------------------------------------------
@@ -1,7 +1,8 @@
-from django.contrib import admin
-from decimal import Decimal
+from django.contrib import admin, messages
 
-from .models import Wallet, Transaction, PaymentOrder, SitePaymentSettings, ZCOIN_RATE_UZS
+from .models import Wallet, Transaction, PaymentOrder, SitePaymentSettings, EarningsDaily, ExchangeRate, JournalEntry, LedgerAccount, PaymentNotification, Posting
+from . import rates
+from .payments import approve_orders
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
@@ -10,7 +11,7 @@ class WalletAdmin(admin.ModelAdmin):
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     # Transaction model stores Z-coin delta in `amount_z`
-    list_display = ("user", "type", "amount_uzs", "amount_z", "created_at")
+    list_display = ("user", "type", "amount_uzs", "amount_z", "rate_uzs", "created_at")
     list_filter = ("type", "created_at")
 
 
@@ -20,18 +21,69 @@ class PaymentOrderAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "z_amount", "amount_uzs", "provider", "status", "created_at")
     list_filter = ("provider", "status", "created_at")
     search_fields = ("user__username", "user__email")
+    actions = ["approve_selected"]
+
+    @admin.action(description="Approve selected top-up requests (credit wallets)")
+    def approve_selected(self, request, queryset):
+        try:
+            approved = approve_orders(list(queryset.values_list("id", flat=True)))
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        total = sum(order.amount_uzs for order in approved)
+        skipped = queryset.count() - len(approved)
+        self.message_user(request, f"Approved {len(approved)} order(s), credited {total} UZS.", messages.SUCCESS)
+        if skipped:
+            self.message_user(request, f"Skipped {skipped} order(s) that were not pending.", messages.WARNING)
 
     @admin.display(description="Z amount", ordering="amount_uzs")
     def z_amount(self, obj: PaymentOrder):
+        # Rate in effect when the order was placed; resolved in memory (wallet.rates).
         if not obj.amount_uzs:
             return 0
-        try:
-            return (Decimal(obj.amount_uzs) / Decimal(ZCOIN_RATE_UZS)).quantize(Decimal("0.01"))
-        except Exception:
-            return 0
+        return rates.uzs_to_z(obj.amount_uzs, rates.rate_at(obj.created_at))
 
 
 @admin.register(SitePaymentSettings)
 class SitePaymentSettingsAdmin(admin.ModelAdmin):
     # SitePaymentSettings fields: card_holder_name, card_last4, telegram_support, teacher_enrollment_fee_z, updated_at
     list_display = ("id", "card_holder_name", "card_last4", "telegram_support", "teacher_enrollment_fee_z", "updated_at")
+
+
+@admin.register(EarningsDaily)
+class EarningsDailyAdmin(admin.ModelAdmin):
+    list_display = ("day", "teacher", "part", "revenue_z", "units_sold", "refunds_z", "refund_units")
+    list_filter = ("day",)
+    search_fields = ("teacher__username",)
+
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(admin.ModelAdmin):
+    list_display = ("code", "currency", "wallet")
+    search_fields = ("code",)
+
+
+class PostingInline(admin.TabularInline):
+    model = Posting
+    extra = 0
+    readonly_fields = ("account", "amount")
+    can_delete = False
+
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "description", "created_at")
+    list_filter = ("kind",)
+    inlines = [PostingInline]
+
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(admin.ModelAdmin):
+    list_display = ("id", "provider", "external_id", "order_id", "status", "amount_uzs", "received_at", "processed_at", "result")
+    list_filter = ("provider", "status", "result")
+    search_fields = ("external_id",)
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("effective_from", "uzs_per_z", "note", "updated_at")
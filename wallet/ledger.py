@@ -0,0 +1,256 @@
+"""Double-entry journal for every money movement.
+
+Each movement is one JournalEntry whose Postings sum to zero per currency.
+User wallets have one account per currency (``wallet:<id>:Z`` / ``wallet:<id>:UZS``).
+Money entering or leaving the system, platform revenue and conversions go through
+the system accounts below, so the balances of all accounts in a currency always
+add up to zero.
+
+``checkpoint()`` stores running balances (BalanceCheckpoint) up to a posting id, so
+``balance()`` and ``reconcile()`` only sum the postings made since the last
+checkpoint instead of the whole history.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Max, OuterRef, Subquery, Sum
+
+from .models import BalanceCheckpoint, JournalEntry, LedgerAccount, Posting, Wallet
+
+Z = "Z"
+UZS = "UZS"
+
+PLATFORM_REVENUE_Z = "platform:revenue:Z"  # course commission, enrollment fees
+PLATFORM_REVENUE_UZS = "platform:revenue:UZS"  # withdrawal fees
+PLATFORM_BONUSES_Z = "platform:bonuses:Z"  # referral bonuses paid out
+PLATFORM_ACTIVITIES_Z = "platform:activities:Z"  # activity entry fees / prizes
+PENDING_EARNINGS_Z = "platform:pending_earnings:Z"  # teacher earnings awaiting settlement
+EXTERNAL_UZS = "external:payments:UZS"  # deposits in, withdrawals out
+EXCHANGE_Z = "exchange:Z"
+EXCHANGE_UZS = "exchange:UZS"
+OPENING_Z = "equity:opening:Z"
+OPENING_UZS = "equity:opening:UZS"
+
+
+CENT = Decimal("0.01")
+
+
+class UnbalancedEntry(ValueError):
+    pass
+
+
+def money(value):
+    # SQLite sums decimals as floats; round aggregates back to cents.
+    return Decimal(value or 0).quantize(CENT)
+
+
+def wallet_code(wallet, currency=Z):
+    wallet_id = wallet.pk if isinstance(wallet, Wallet) else wallet
+    return f"wallet:{wallet_id}:{currency}"
+
+
+def _currency(code):
+    return code.rsplit(":", 1)[1]
+
+
+def conversion_lines(wallet, uzs_amount, z_amount):
+    """Postings for exchanging ``uzs_amount`` of a wallet's UZS into ``z_amount`` Z."""
+    return [
+        (wallet_code(wallet, UZS), -uzs_amount),
+        (EXCHANGE_UZS, uzs_amount),
+        (EXCHANGE_Z, -z_amount),
+        (wallet_code(wallet, Z), z_amount),
+    ]
+
+
+def _account_ids(codes):
+    ids = dict(LedgerAccount.objects.filter(code__in=codes).values_list("code", "id"))
+    missing = [code for code in codes if code not in ids]
+    if missing:
+        LedgerAccount.objects.bulk_create(
+            [
+                LedgerAccount(
+                    code=code,
+                    currency=_currency(code),
+                    wallet_id=int(code.split(":")[1]) if code.startswith("wallet:") else None,
+                )
+                for code in missing
+            ],
+            ignore_conflicts=True,
+        )
+        ids.update(LedgerAccount.objects.filter(code__in=missing).values_list("code", "id"))
+    return ids
+
+
+def insert_rows(model, fields, rows):
+    """INSERT ``rows`` (tuples of values for ``fields``) with one executemany.
+
+    For journal-sized batches: bulk_create runs every value through the ORM's
+    per-field preparation, which dominates the cost of thousands of rows.
+    Decimal and datetime values are adapted here; no defaults, auto_now or
+    signals apply, so ``fields`` must cover every required column.
+    """
+    connection = connections[router.db_for_write(model)]
+    columns = [model._meta.get_field(name) for name in fields]
+    adapters = []
+    for field in columns:
+        if field.get_internal_type() == "DecimalField":
+            adapters.append(
+                lambda v, f=field: connection.ops.adapt_decimalfield_value(v, f.max_digits, f.decimal_places)
+            )
+        elif field.get_internal_type() == "DateTimeField":
+            adapters.append(connection.ops.adapt_datetimefield_value)
+        else:
+            adapters.append(None)
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    adapted = {}  # amounts and timestamps repeat across a batch; adapt each once
+
+    def prepare(adapt, value):
+        if adapt is None or value is None:
+            return value
+        key = (adapt, value)
+        if key not in adapted:
+            adapted[key] = adapt(value)
+        return adapted[key]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [tuple(map(prepare, adapters, row)) for row in rows])
+
+
+def post(kind, lines, description=""):
+    """Record one balanced entry. ``lines`` is an iterable of ``(account code, amount)``.
+
+    Positive amounts increase the account's balance. Raises UnbalancedEntry when the
+    amounts do not sum to zero within each currency.
+    """
+    lines = [(code, Decimal(amount)) for code, amount in lines if amount]
+    totals = defaultdict(Decimal)
+    for code, amount in lines:
+        totals[_currency(code)] += amount
+    if any(totals.values()):
+        raise UnbalancedEntry(f"Unbalanced {kind} entry: {dict(totals)}")
+    if not lines:
+        return None
+
+    with transaction.atomic():
+        ids = _account_ids({code for code, _ in lines})
+        entry = JournalEntry.objects.create(kind=kind, description=(description or "")[:255])
+        insert_rows(Posting, ("entry", "account", "amount"), [(entry.pk, ids[code], amount) for code, amount in lines])
+    return entry
+
+
+def _latest_checkpoints(account_ids=None, upto=None):
+    """{account_id: (posting_id, balance)} of each account's newest checkpoint (<= ``upto``)."""
+    checkpoints = BalanceCheckpoint.objects.all()
+    if upto is not None:
+        checkpoints = checkpoints.filter(posting_id__lte=upto)
+    newest = checkpoints.filter(account_id=OuterRef("account_id")).order_by("-posting_id").values("posting_id")[:1]
+    rows = checkpoints.filter(posting_id=Subquery(newest))
+    if account_ids is not None:
+        rows = rows.filter(account_id__in=account_ids)
+    return {a: (p, b) for a, p, b in rows.values_list("account_id", "posting_id", "balance")}
+
+
+def _posting_bound(as_of):
+    """Largest posting id recorded at or before the datetime ``as_of`` (0 if none)."""
+    entry_id = (
+        JournalEntry.objects.filter(created_at__lte=as_of)
+        .order_by("-created_at", "-id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    if entry_id is None:
+        return 0
+    return Posting.objects.filter(entry_id=entry_id).aggregate(m=Max("id"))["m"] or 0
+
+
+def balance(code, as_of=None):
+    """Balance of account ``code``, optionally at the datetime ``as_of``."""
+    account_id = LedgerAccount.objects.filter(code=code).values_list("id", flat=True).first()
+    if account_id is None:
+        return Decimal("0")
+    upto = _posting_bound(as_of) if as_of is not None else None
+    after, base = _latest_checkpoints([account_id], upto).get(account_id, (0, Decimal("0")))
+    postings = Posting.objects.filter(account_id=account_id, id__gt=after)
+    if upto is not None:
+        postings = postings.filter(id__lte=upto)
+    return base + money(postings.aggregate(s=Sum("amount"))["s"])
+
+
+def checkpoint():
+    """Write a checkpoint for every account posted to since the previous run.
+
+    Returns the number of checkpoints created. Only postings newer than the last
+    checkpoint are read.
+    """
+    with transaction.atomic():
+        last = BalanceCheckpoint.objects.aggregate(m=Max("posting_id"))["m"] or 0
+        high_water = Posting.objects.aggregate(m=Max("id"))["m"] or 0
+        if high_water <= last:
+            return 0
+        deltas = {
+            account_id: money(total)
+            for account_id, total in Posting.objects.filter(id__gt=last, id__lte=high_water)
+            .values("account_id")
+            .annotate(total=Sum("amount"))
+            .values_list("account_id", "total")
+        }
+        previous = _latest_checkpoints(deltas.keys())
+        BalanceCheckpoint.objects.bulk_create(
+            [
+                BalanceCheckpoint(
+                    account_id=account_id,
+                    posting_id=high_water,
+                    balance=previous.get(account_id, (0, Decimal("0")))[1] + delta,
+                )
+                for account_id, delta in deltas.items()
+            ]
+        )
+    return len(deltas)
+
+
+def reconcile():
+    """Compare ledger balances with Wallet balances.
+
+    Reads the newest checkpoints plus the postings after them. Returns a dict with
+    ``mismatches`` (code, ledger balance, wallet balance), ``unbalanced_entries``
+    (entry ids since the last checkpoint whose postings do not net to zero) and
+    ``totals`` per currency (all zero when the books balance).
+    """
+    last = BalanceCheckpoint.objects.aggregate(m=Max("posting_id"))["m"] or 0
+    balances = {a: b for a, (_, b) in _latest_checkpoints().items()}
+    recent = Posting.objects.filter(id__gt=last)
+    for account_id, delta in recent.values("account_id").annotate(total=Sum("amount")).values_list(
+        "account_id", "total"
+    ):
+        balances[account_id] = balances.get(account_id, Decimal("0")) + money(delta)
+
+    by_code = {}
+    totals = defaultdict(Decimal)
+    for account_id, code, currency in LedgerAccount.objects.values_list("id", "code", "currency"):
+        by_code[code] = balances.get(account_id, Decimal("0"))
+        totals[currency] += by_code[code]
+
+    mismatches = []
+    for wallet_id, balance_z, balance_uzs in Wallet.objects.values_list("id", "balance_z", "balance_uzs"):
+        for currency, actual in ((Z, balance_z), (UZS, balance_uzs)):
+            code = wallet_code(wallet_id, currency)
+            expected = by_code.get(code, Decimal("0"))
+            if expected != actual:
+                mismatches.append((code, expected, actual))
+
+    unbalanced = sorted(
+        {
+            entry_id
+            for entry_id, total in recent.values("entry_id", "account__currency")
+            .annotate(total=Sum("amount"))
+            .values_list("entry_id", "total")
+            if money(total)
+        }
+    )
+    return {"mismatches": mismatches, "unbalanced_entries": unbalanced, "totals": dict(totals)}
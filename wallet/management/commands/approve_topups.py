@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.models import PaymentOrder
+from wallet.payments import approve_orders
+
+
+class Command(BaseCommand):
+    help = "Approve pending manual top-up requests (PaymentOrder status=created) in one transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("order_ids", nargs="*", type=int)
+        parser.add_argument("--all-pending", action="store_true", help="Approve every pending order.")
+        parser.add_argument("--provider", help="With --all-pending, only orders of this provider (e.g. card).")
+
+    def handle(self, *args, **options):
+        order_ids = options["order_ids"]
+        if options["all_pending"]:
+            pending = PaymentOrder.objects.filter(status="created")
+            if options["provider"]:
+                pending = pending.filter(provider=options["provider"])
+            order_ids = list(pending.values_list("id", flat=True))
+        elif not order_ids:
+            raise CommandError("Pass order ids or --all-pending.")
+        try:
+            approved = approve_orders(order_ids)
+        except ValueError as e:
+            raise CommandError(str(e))
+        total = sum(order.amount_uzs for order in approved)
+        self.stdout.write(self.style.SUCCESS(f"Approved {len(approved)} of {len(order_ids)} order(s), credited {total} UZS."))
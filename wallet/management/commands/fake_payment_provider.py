@@ -0,0 +1,88 @@
+import json
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from wallet import payments
+from wallet.models import PaymentOrder, Wallet
+from wallet.views import payment_webhook
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline stand-in for a payment provider: creates orders for a user, replays their "
+        "callbacks (with duplicates, shuffled) through the webhook view, runs the worker, "
+        "and checks every order was credited exactly once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--orders", type=int, default=1000)
+        parser.add_argument("--replays", type=int, default=3, help="Times each callback is delivered.")
+        parser.add_argument("--fail-rate", type=float, default=0.05, help="Share of orders reported as failed.")
+        parser.add_argument("--provider", default="payme", choices=sorted(payments.PROVIDERS))
+        parser.add_argument("--batch-size", type=int, default=payments.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['username']!r}.")
+        provider = options["provider"]
+        wallet, _ = Wallet.objects.get_or_create(user=user)
+        start_uzs = wallet.balance_uzs
+
+        orders = PaymentOrder.objects.bulk_create(
+            [
+                PaymentOrder(user=user, provider=provider, amount_uzs=Decimal(random.randint(1, 500) * 1000),
+                             note="fake_payment_provider")
+                for _ in range(options["orders"])
+            ]
+        )
+        callbacks = []
+        for order in orders:
+            status = "failed" if random.random() < options["fail_rate"] else "paid"
+            body = {"external_id": uuid.uuid4().hex, "order_id": order.pk, "amount": str(order.amount_uzs), "status": status}
+            callbacks.extend([body] * options["replays"])
+        random.shuffle(callbacks)
+
+        secret = "fake-provider"
+        factory = RequestFactory()
+        with override_settings(PAYMENT_WEBHOOK_SECRET=secret):
+            started = time.monotonic()
+            duplicates = 0
+            for body in callbacks:
+                raw = json.dumps(body).encode()
+                request = factory.post(
+                    f"/wallet/webhooks/{provider}/", raw, content_type="application/json",
+                    **{payments.SIGNATURE_HEADER: payments.sign(raw, secret)},
+                )
+                response = payment_webhook(request, provider)
+                if response.status_code != 200:
+                    raise CommandError(f"Webhook rejected a callback: {response.content!r}")
+                duplicates += json.loads(response.content)["duplicate"]
+            ingest_s = time.monotonic() - started
+
+        started = time.monotonic()
+        summary = payments.process_pending(batch_size=options["batch_size"])
+        process_s = time.monotonic() - started
+
+        order_ids = [order.pk for order in orders]
+        paid_total = PaymentOrder.objects.filter(pk__in=order_ids, status="paid").aggregate(s=Sum("amount_uzs"))["s"] or 0
+        wallet.refresh_from_db()
+        self.stdout.write(
+            f"Ingested {len(callbacks)} callbacks ({duplicates} duplicates) in {ingest_s:.2f}s "
+            f"({len(callbacks) / max(ingest_s, 1e-9):.0f}/s); processed in {process_s:.2f}s: {summary}"
+        )
+        if wallet.balance_uzs - start_uzs != paid_total:
+            raise CommandError(f"Wallet grew by {wallet.balance_uzs - start_uzs}, paid orders total {paid_total}.")
+        self.stdout.write(self.style.SUCCESS(f"Every paid order was credited exactly once ({paid_total} UZS)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from wallet.ledger import checkpoint
+
+
+class Command(BaseCommand):
+    help = "Store running ledger balances so reconciliation only reads newer postings (run e.g. hourly)."
+
+    def handle(self, *args, **options):
+        created = checkpoint()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} balance checkpoint(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check wallet balances against the double-entry ledger."
+
+    def handle(self, *args, **options):
+        report = reconcile()
+        for code, expected, actual in report["mismatches"]:
+            self.stdout.write(f"{code}: ledger {expected}, wallet {actual}")
+        if report["unbalanced_entries"]:
+            self.stdout.write(f"Unbalanced journal entries: {report['unbalanced_entries']}")
+        for currency, total in report["totals"].items():
+            if total:
+                self.stdout.write(f"{currency} accounts sum to {total}, expected 0")
+        if report["mismatches"] or report["unbalanced_entries"] or any(report["totals"].values()):
+            raise CommandError("Ledger does not reconcile.")
+        self.stdout.write(self.style.SUCCESS("Ledger reconciles with wallet balances."))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallet.payments import BATCH_SIZE, process_pending
+
+
+class Command(BaseCommand):
+    help = "Apply pending payment provider callbacks from the inbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the inbox instead of exiting when empty.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            summary = process_pending(batch_size=options["batch_size"])
+            if summary:
+                self.stdout.write(", ".join(f"{result}: {count}" for result, count in sorted(summary.items())))
+            if not options["loop"]:
+                return
+            time.sleep(options["sleep"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wallet.rollups import BATCH_SIZE, refresh_earnings
+
+
+class Command(BaseCommand):
+    help = "Fold new Transaction rows into the EarningsDaily rollup (run periodically, e.g. every few minutes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        scanned = refresh_earnings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {scanned} new ledger id(s)."))
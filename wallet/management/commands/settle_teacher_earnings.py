@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from wallet.operations import settle_pending_earnings
+
+
+class Command(BaseCommand):
+    help = "Move pending teacher earnings into wallet balances (run periodically when TEACHER_EARNINGS_MODE=deferred)."
+
+    def handle(self, *args, **options):
+        wallets, rows = settle_pending_earnings()
+        self.stdout.write(self.style.SUCCESS(f"Settled {rows} pending earning(s) into {wallets} wallet(s)."))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_course_recommendations'),
+        ('wallet', '0004_alter_sitepaymentsettings_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='course_part',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='courses.coursepart'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('deposit', 'Deposit UZS'), ('convert_to_z', 'Convert to Z coins'), ('course_purchase', 'Course purchase'), ('tournament_fee', 'Tournament fee'), ('prize', 'Prize'), ('withdraw', 'Withdraw'), ('referral_bonus', 'Referral bonus'), ('refund', 'Refund')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='EarningsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue_z', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('refunds_z', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('refund_units', models.PositiveIntegerField(default=0)),
+                ('part', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.coursepart')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['teacher', 'day'], name='earnings_teacher_day_idx')],
+            },
+        ),
+    ]
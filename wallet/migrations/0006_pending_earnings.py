@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_earnings_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingEarning',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_z', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_earnings', to='wallet.wallet')),
+            ],
+        ),
+    ]
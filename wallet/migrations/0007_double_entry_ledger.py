@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def open_ledger(apps, schema_editor):
+    """Post existing balances against the opening-equity accounts so the books start reconciled."""
+    Wallet = apps.get_model("wallet", "Wallet")
+    PendingEarning = apps.get_model("wallet", "PendingEarning")
+    LedgerAccount = apps.get_model("wallet", "LedgerAccount")
+    JournalEntry = apps.get_model("wallet", "JournalEntry")
+    Posting = apps.get_model("wallet", "Posting")
+
+    lines = []
+    for wallet_id, balance_z, balance_uzs in Wallet.objects.values_list("id", "balance_z", "balance_uzs"):
+        lines.append((f"wallet:{wallet_id}:Z", wallet_id, balance_z))
+        lines.append((f"wallet:{wallet_id}:UZS", wallet_id, balance_uzs))
+    pending = PendingEarning.objects.aggregate(s=Sum("amount_z"))["s"]
+    lines.append(("platform:pending_earnings:Z", None, pending))
+    lines = [line for line in lines if line[2]]
+    if not lines:
+        return
+    for currency in ("Z", "UZS"):
+        total = sum(amount for code, _, amount in lines if code.endswith(":" + currency))
+        if total:
+            lines.append((f"equity:opening:{currency}", None, -total))
+
+    accounts = LedgerAccount.objects.bulk_create(
+        [LedgerAccount(code=code, currency=code.rsplit(":", 1)[1], wallet_id=wallet_id) for code, wallet_id, _ in lines],
+        batch_size=500,
+    )
+    entry = JournalEntry.objects.create(kind="opening_balance", description="Balances before the ledger existed")
+    Posting.objects.bulk_create(
+        [Posting(entry=entry, account=account, amount=line[2]) for account, line in zip(accounts, lines)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_pending_earnings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=64, unique=True)),
+                ('currency', models.CharField(max_length=3)),
+                ('wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_accounts', to='wallet.wallet')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posting_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='wallet.ledgeraccount')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', '-posting_id'], name='checkpoint_account_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='wallet.ledgeraccount')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='wallet.journalentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'id'], name='posting_account_id_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0008_transaction_statement_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('payme', 'Payme'), ('click', 'Click'), ('card', 'Card')], max_length=20)),
+                ('external_id', models.CharField(max_length=64)),
+                ('order_id', models.BigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('created', 'Created'), ('paid', 'Paid'), ('failed', 'Failed'), ('canceled', 'Canceled')], max_length=20)),
+                ('amount_uzs', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, max_length=30)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='payment_inbox_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'external_id'), name='payment_notification_unique')],
+            },
+        ),
+    ]
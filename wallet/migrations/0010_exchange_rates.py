@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+import datetime
+from decimal import Decimal
+
+from django.db import migrations, models
+
+INITIAL_RATE = Decimal("10000")  # the former hard-coded ZCOIN_RATE_UZS
+
+
+def seed_rate(apps, schema_editor):
+    ExchangeRate = apps.get_model("wallet", "ExchangeRate")
+    Transaction = apps.get_model("wallet", "Transaction")
+    ExchangeRate.objects.create(
+        uzs_per_z=INITIAL_RATE,
+        effective_from=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc),
+        note="Initial rate",
+    )
+    Transaction.objects.filter(type__in=["convert_to_z", "withdraw"], rate_uzs__isnull=True).update(rate_uzs=INITIAL_RATE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0009_payment_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uzs_per_z', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('effective_from', models.DateTimeField(unique=True)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-effective_from'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='rate_uzs',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True),
+        ),
+        migrations.RunPython(seed_rate, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,7 @@ from decimal import Decimal
 
 User = settings.AUTH_USER_MODEL
 
+# Fallback only: the live rate is the ExchangeRate row in effect (see wallet.rates).
 ZCOIN_RATE_UZS = Decimal("10000")   # 1 Z = 10 000 so'm
 REFERRAL_BONUS_RATE = Decimal("0.05")  # 5% of z purchase as bonus
 
@@ -15,30 +16,23 @@ class Wallet(models.Model):
     def __str__(self):
         return f"{self.user.username} wallet"
 
+    # Balance changes go through wallet.operations: one conditional UPDATE each,
+    # never a read-modify-write save() that could lose a concurrent update.
     def deposit_uzs(self, amount):
-        self.balance_uzs += Decimal(amount)
-        self.save()
-
-    def convert_uzs_to_z(self, uzs_amount):
-        uzs_amount = Decimal(uzs_amount)
-        if uzs_amount > self.balance_uzs:
-            raise ValueError("Not enough UZS")
-        z_amount = uzs_amount / ZCOIN_RATE_UZS
-        self.balance_uzs -= uzs_amount
-        self.balance_z += z_amount
-        self.save()
-        return z_amount
+        from .operations import credit
+        credit(self, uzs=amount)
+
+    def convert_uzs_to_z(self, uzs_amount, rate=None):
+        from .operations import convert_uzs_to_z
+        return convert_uzs_to_z(self, uzs_amount, rate=rate)
 
     def spend_z(self, z_amount):
-        z_amount = Decimal(z_amount)
-        if z_amount > self.balance_z:
-            raise ValueError("Not enough Z coins")
-        self.balance_z -= z_amount
-        self.save()
+        from .operations import debit
+        debit(self, z=z_amount, message="Not enough Z coins")
 
     def credit_z(self, z_amount):
-        self.balance_z += Decimal(z_amount)
-        self.save()
+        from .operations import credit
+        credit(self, z=z_amount)
 
 TRANSACTION_TYPES = [
     ("deposit", "Deposit UZS"),
@@ -48,6 +42,7 @@ TRANSACTION_TYPES = [
     ("prize", "Prize"),
     ("withdraw", "Withdraw"),
     ("referral_bonus", "Referral bonus"),
+    ("refund", "Refund"),
 ]
 
 PAYMENT_PROVIDERS = [
@@ -83,6 +78,35 @@ class PaymentOrder(models.Model):
     def __str__(self):
         return f"{self.provider} {self.amount_uzs} ({self.status})"
 
+class PaymentNotification(models.Model):
+    """Provider callback inbox (see wallet.payments).
+
+    Webhooks only insert here; (provider, external_id) is unique so replayed
+    callbacks are dropped on arrival. A worker applies pending rows in batches.
+    """
+
+    provider = models.CharField(max_length=20, choices=PAYMENT_PROVIDERS)
+    external_id = models.CharField(max_length=64)
+    order_id = models.BigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=PAYMENT_STATUSES)
+    amount_uzs = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    payload = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=30, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "external_id"], name="payment_notification_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(processed_at__isnull=True), name="payment_inbox_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.external_id} ({self.status})"
+
+
 class Transaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="transactions")
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transactions")
@@ -91,11 +115,35 @@ class Transaction(models.Model):
     amount_uzs = models.DecimalField(max_digits=18, decimal_places=2, default=0)
     amount_z = models.DecimalField(max_digits=18, decimal_places=2, default=0)
     description = models.CharField(max_length=255, blank=True, null=True)
+    # UZS per Z applied to this row (conversions and withdrawals).
+    rate_uzs = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    # Set for course purchases/refunds so earnings can be rolled up per part.
+    course_part = models.ForeignKey(
+        "courses.CoursePart", on_delete=models.SET_NULL, null=True, blank=True, related_name="transactions"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["wallet", "-created_at", "-id"], name="tx_wallet_created_idx")]
 
     def __str__(self):
         return f"{self.type} - {self.user} - {self.created_at:%Y-%m-%d}"
 
 
+class ExchangeRate(models.Model):
+    """UZS per Z coin from ``effective_from`` until the next row takes over."""
+
+    uzs_per_z = models.DecimalField(max_digits=18, decimal_places=4)
+    effective_from = models.DateTimeField(unique=True)
+    note = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-effective_from"]
+
+    def __str__(self):
+        return f"1 Z = {self.uzs_per_z} UZS from {self.effective_from:%Y-%m-%d %H:%M}"
+
+
 class SitePaymentSettings(models.Model):
     """Singleton-like settings editable in Django admin.
 
@@ -112,3 +160,103 @@ class SitePaymentSettings(models.Model):
 
     def __str__(self):
         return "Site Payment Settings"
+
+
+class PendingEarning(models.Model):
+    """Teacher credit not yet settled into Wallet.balance_z (TEACHER_EARNINGS_MODE="deferred").
+
+    Rows are insert-only until wallet.operations.settle_pending_earnings folds them
+    into the wallet and deletes them; the ledger history lives in Transaction.
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="pending_earnings")
+    amount_z = models.DecimalField(max_digits=18, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.wallet} +{self.amount_z} Z (pending)"
+
+
+class EarningsDaily(models.Model):
+    """Teacher earnings per part per local day, rolled up from Transaction by wallet.rollups.
+
+    ``part`` is null for ledger rows recorded before purchases referenced a part.
+    """
+
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name="earnings_daily")
+    part = models.ForeignKey("courses.CoursePart", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    day = models.DateField()
+    revenue_z = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    refunds_z = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    refund_units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["teacher", "day"], name="earnings_teacher_day_idx")]
+
+    def __str__(self):
+        return f"{self.teacher} {self.day}: {self.revenue_z} Z"
+
+
+class RollupCheckpoint(models.Model):
+    """High-water mark (last processed Transaction id) of an incremental rollup."""
+
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class LedgerAccount(models.Model):
+    """An account in the double-entry journal (see wallet.ledger).
+
+    ``code`` is ``"wallet:<wallet id>:<currency>"`` for user wallets or a system
+    name such as ``"platform:revenue:Z"``; the suffix is the account currency.
+    """
+
+    code = models.CharField(max_length=64, unique=True)
+    currency = models.CharField(max_length=3)
+    wallet = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_accounts")
+
+    def __str__(self):
+        return self.code
+
+
+class JournalEntry(models.Model):
+    """One money movement; its postings sum to zero per currency."""
+
+    kind = models.CharField(max_length=50)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+
+class Posting(models.Model):
+    entry = models.ForeignKey(JournalEntry, on_delete=models.PROTECT, related_name="postings")
+    account = models.ForeignKey(LedgerAccount, on_delete=models.PROTECT, related_name="postings")
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=["account", "id"], name="posting_account_id_idx")]
+
+    def __str__(self):
+        return f"{self.account} {self.amount:+}"
+
+
+class BalanceCheckpoint(models.Model):
+    """Balance of ``account`` including every posting with id <= ``posting_id``."""
+
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name="checkpoints")
+    posting_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=18, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["account", "-posting_id"], name="checkpoint_account_idx")]
+
+    def __str__(self):
+        return f"{self.account} @{self.posting_id}: {self.balance}"
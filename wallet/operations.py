@@ -0,0 +1,154 @@
+"""Atomic wallet balance mutations.
+
+Every helper here is a single ``UPDATE wallet_wallet SET ... WHERE id = %s``.
+Debits carry their balance check in the WHERE clause (``balance >= amount``), so
+concurrent spends can never overdraw or lose each other's writes. A zero row
+count means the funds were not there, which is reported as InsufficientFunds.
+
+Callers that need several mutations to succeed or fail together (e.g. a purchase
+that converts UZS, debits the student and credits the teacher) wrap them in
+``transaction.atomic()``.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import ledger, rates
+from .models import PendingEarning, Wallet
+
+_ZERO = Value(Decimal("0"), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+
+class InsufficientFunds(ValueError):
+    pass
+
+
+def _wallet_id(wallet):
+    return wallet.pk if isinstance(wallet, Wallet) else wallet
+
+
+def debit(wallet, z=0, uzs=0, message="Not enough funds"):
+    """Subtract ``z``/``uzs`` from the wallet if (and only if) both balances cover it."""
+    z, uzs = Decimal(z), Decimal(uzs)
+    if z < 0 or uzs < 0:
+        raise ValueError("Amount must be positive.")
+    updated = Wallet.objects.filter(
+        pk=_wallet_id(wallet), balance_z__gte=z, balance_uzs__gte=uzs
+    ).update(balance_z=F("balance_z") - z, balance_uzs=F("balance_uzs") - uzs)
+    if not updated:
+        raise InsufficientFunds(message)
+    _apply(wallet, -z, -uzs)
+
+
+def credit(wallet, z=0, uzs=0):
+    z, uzs = Decimal(z), Decimal(uzs)
+    if z < 0 or uzs < 0:
+        raise ValueError("Amount must be positive.")
+    Wallet.objects.filter(pk=_wallet_id(wallet)).update(
+        balance_z=F("balance_z") + z, balance_uzs=F("balance_uzs") + uzs
+    )
+    _apply(wallet, z, uzs)
+
+
+def convert_uzs_to_z(wallet, uzs_amount, rate=None):
+    """Move ``uzs_amount`` from the UZS balance into Z coins; returns the Z credited.
+
+    ``rate`` (UZS per Z) defaults to the rate in effect now; callers that record
+    the rate on a Transaction should resolve it once and pass it in.
+    """
+    uzs_amount = Decimal(uzs_amount)
+    if uzs_amount <= 0:
+        raise ValueError("Amount must be positive.")
+    z_amount = rates.uzs_to_z(uzs_amount, rate or rates.current_rate())
+    if z_amount <= 0:
+        raise ValueError("Amount is too small to convert.")
+    updated = Wallet.objects.filter(pk=_wallet_id(wallet), balance_uzs__gte=uzs_amount).update(
+        balance_uzs=F("balance_uzs") - uzs_amount, balance_z=F("balance_z") + z_amount
+    )
+    if not updated:
+        raise InsufficientFunds("Not enough UZS")
+    _apply(wallet, z_amount, -uzs_amount)
+    return z_amount
+
+
+def accrue_earning(wallet, z):
+    """Credit teacher earnings according to settings.TEACHER_EARNINGS_MODE.
+
+    In "deferred" mode the sale only inserts a PendingEarning row, so concurrent
+    sales of one teacher's courses never touch (or lock) the same wallet row.
+    Returns the ledger account code that received the credit.
+    """
+    if getattr(settings, "TEACHER_EARNINGS_MODE", "immediate") == "deferred":
+        PendingEarning.objects.create(wallet_id=_wallet_id(wallet), amount_z=Decimal(z))
+        return ledger.PENDING_EARNINGS_Z
+    credit(wallet, z=z)
+    return ledger.wallet_code(wallet)
+
+
+def pending_z(wallet):
+    return ledger.money(
+        PendingEarning.objects.filter(wallet_id=_wallet_id(wallet)).aggregate(
+            total=Coalesce(Sum("amount_z"), _ZERO)
+        )["total"]
+    )
+
+
+def balance_with_pending(wallet):
+    """Return ``(available_z, pending_z)`` read together in one query."""
+    row = (
+        Wallet.objects.filter(pk=_wallet_id(wallet))
+        .annotate(
+            pending=Coalesce(
+                Subquery(
+                    PendingEarning.objects.filter(wallet_id=OuterRef("pk"))
+                    .values("wallet_id")
+                    .annotate(total=Sum("amount_z"))
+                    .values("total")
+                ),
+                _ZERO,
+            )
+        )
+        .values_list("balance_z", "pending")
+        .get()
+    )
+    return ledger.money(row[0]), ledger.money(row[1])
+
+
+def settle_pending_earnings():
+    """Fold every PendingEarning row into its wallet; returns (wallets, rows) settled.
+
+    One UPDATE credits all affected wallets and one DELETE drops the settled rows,
+    both bounded by the id high-water mark read at the start, so sales arriving
+    during settlement simply wait for the next run.
+    """
+    with transaction.atomic():
+        high_water = PendingEarning.objects.aggregate(m=Max("id"))["m"]
+        if high_water is None:
+            return 0, 0
+        batch = PendingEarning.objects.filter(id__lte=high_water)
+        totals = list(batch.values("wallet_id").annotate(total=Sum("amount_z")).values_list("wallet_id", "total"))
+        wallets = Wallet.objects.filter(pk__in=batch.values("wallet_id")).update(
+            balance_z=F("balance_z")
+            + Subquery(
+                batch.filter(wallet_id=OuterRef("pk")).values("wallet_id").annotate(total=Sum("amount_z")).values("total")
+            )
+        )
+        rows, _ = batch.delete()
+        ledger.post(
+            "settlement",
+            [(ledger.PENDING_EARNINGS_Z, -sum(t for _, t in totals))]
+            + [(ledger.wallet_code(wallet_id), total) for wallet_id, total in totals],
+            description=f"Settled {rows} pending earning(s)",
+        )
+    return wallets, rows
+
+
+def _apply(wallet, dz, duzs):
+    # Keep an in-memory instance roughly in step for templates/messages;
+    # the database row is the source of truth (use refresh_from_db() for exact values).
+    if isinstance(wallet, Wallet):
+        wallet.balance_z += dz
+        wallet.balance_uzs += duzs
@@ -0,0 +1,192 @@
+"""Payment provider callbacks: an idempotent inbox plus a batch worker.
+
+The webhook only verifies the signature and inserts a PaymentNotification;
+replays of the same ``(provider, external_id)`` hit the unique constraint and
+are acknowledged without a second row. ``process_pending`` (run by the
+``process_payment_notifications`` command) applies the inbox in batches. It moves
+each order ``created -> paid`` with a conditional UPDATE, so an order is credited
+at most once however many callbacks or clicks arrive for it.
+
+Manual card top-up requests are approved in bulk by ``approve_orders`` (admin
+action and ``approve_topups`` command), which shares the same crediting path.
+"""
+import hashlib
+import hmac
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+
+from . import ledger, operations
+from .models import PAYMENT_PROVIDERS, PaymentNotification, PaymentOrder, Transaction, Wallet
+
+BATCH_SIZE = 500
+SIGNATURE_HEADER = "HTTP_X_NOK_SIGNATURE"
+
+PROVIDERS = {value for value, _ in PAYMENT_PROVIDERS}
+NOTIFICATION_STATUSES = {"paid", "failed", "canceled"}
+
+
+class InvalidNotification(ValueError):
+    pass
+
+
+def sign(body, secret=None):
+    secret = settings.PAYMENT_WEBHOOK_SECRET if secret is None else secret
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature):
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        return settings.DEBUG
+    return hmac.compare_digest(sign(body), signature or "")
+
+
+def parse_notification(data):
+    """Normalise a Payme/Click-style callback body into PaymentNotification fields."""
+    if not isinstance(data, dict):
+        raise InvalidNotification("Notification body must be a JSON object.")
+    external_id = str(data.get("external_id") or data.get("transaction_id") or data.get("id") or "").strip()
+    status = str(data.get("status") or data.get("state") or "").lower()
+    try:
+        order_id = int(data.get("order_id") or data.get("merchant_trans_id"))
+        amount = Decimal(str(data.get("amount_uzs", data.get("amount", "0"))))
+    except (TypeError, ValueError, InvalidOperation):
+        raise InvalidNotification("order_id and amount must be numbers.")
+    if not amount.is_finite() or amount <= 0:
+        raise InvalidNotification("amount must be a positive number.")
+    if not external_id or len(external_id) > 64:
+        raise InvalidNotification("external_id is required.")
+    if status not in NOTIFICATION_STATUSES:
+        raise InvalidNotification(f"Unknown status {status!r}.")
+    return {"external_id": external_id, "order_id": order_id, "status": status, "amount_uzs": amount}
+
+
+def ingest(provider, data):
+    """Store one callback in the inbox; returns ``(notification, created)``."""
+    fields = parse_notification(data)
+    try:
+        with db_transaction.atomic():
+            return PaymentNotification.objects.create(provider=provider, payload=data, **fields), True
+    except IntegrityError:
+        return PaymentNotification.objects.get(provider=provider, external_id=fields["external_id"]), False
+
+
+def _claim(order_id, external_id=None):
+    """created -> paid as one conditional UPDATE; False if someone else got there first."""
+    changes = {"status": "paid", "paid_at": timezone.now()}
+    if external_id:
+        changes["external_id"] = external_id
+    return bool(PaymentOrder.objects.filter(pk=order_id, status="created").update(**changes))
+
+
+def _credit_orders(orders):
+    """Deposit the UZS of freshly claimed orders: one UPDATE per wallet, bulk ledger rows."""
+    if not orders:
+        return
+    user_ids = {order.user_id for order in orders}
+    Wallet.objects.bulk_create([Wallet(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+    wallet_ids = dict(Wallet.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+
+    per_wallet = defaultdict(Decimal)
+    for order in orders:
+        per_wallet[wallet_ids[order.user_id]] += order.amount_uzs
+    for wallet_id, amount in per_wallet.items():
+        operations.credit(wallet_id, uzs=amount)
+
+    Transaction.objects.bulk_create(
+        [
+            Transaction(
+                user_id=order.user_id,
+                wallet_id=wallet_ids[order.user_id],
+                type="deposit",
+                amount_uzs=order.amount_uzs,
+                description=f"Top up via {order.get_provider_display()} (order #{order.pk})",
+            )
+            for order in orders
+        ],
+        batch_size=500,
+    )
+    ledger.post(
+        "deposit",
+        [(ledger.EXTERNAL_UZS, -sum(per_wallet.values()))]
+        + [(ledger.wallet_code(wallet_id, ledger.UZS), amount) for wallet_id, amount in per_wallet.items()],
+        description=f"{len(orders)} payment order(s)",
+    )
+
+
+def complete_order(order, external_id=None):
+    """Mark one order paid and credit it; returns False if it was already completed."""
+    with db_transaction.atomic():
+        if not _claim(order.pk, external_id):
+            return False
+        _credit_orders([order])
+    return True
+
+
+def approve_orders(order_ids):
+    """Approve pending top-up requests in one transaction; returns the approved orders.
+
+    Orders that are no longer ``created`` are skipped. Balances are incremented with
+    one UPDATE per wallet and statuses flipped with a single UPDATE.
+    """
+    with db_transaction.atomic():
+        orders = list(PaymentOrder.objects.select_for_update().filter(pk__in=order_ids, status="created"))
+        if not orders:
+            return []
+        updated = PaymentOrder.objects.filter(pk__in=[order.pk for order in orders], status="created").update(
+            status="paid", paid_at=timezone.now()
+        )
+        if updated != len(orders):
+            raise ValueError("Some orders changed while approving; nothing was approved, please retry.")
+        _credit_orders(orders)
+    return orders
+
+
+def _apply(batch):
+    """Apply one batch of notifications; returns {notification id: result}."""
+    orders = PaymentOrder.objects.in_bulk({n.order_id for n in batch})
+    results, paid = {}, []
+    for notification in batch:
+        order = orders.get(notification.order_id)
+        if order is None:
+            results[notification.pk] = "unknown_order"
+        elif notification.status == "paid":
+            if notification.amount_uzs != order.amount_uzs:
+                results[notification.pk] = "amount_mismatch"
+            elif _claim(order.pk, notification.external_id):
+                order.status = "paid"
+                paid.append(order)
+                results[notification.pk] = "applied"
+            else:
+                results[notification.pk] = "already_final"
+        elif PaymentOrder.objects.filter(pk=order.pk, status="created").update(status=notification.status):
+            results[notification.pk] = notification.status
+        else:
+            results[notification.pk] = "already_final"
+    _credit_orders(paid)
+    return results
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """Apply every unprocessed notification, ``batch_size`` per transaction.
+
+    Returns a {result: count} summary.
+    """
+    summary = defaultdict(int)
+    while True:
+        with db_transaction.atomic():
+            batch = list(PaymentNotification.objects.filter(processed_at__isnull=True).order_by("id")[:batch_size])
+            if not batch:
+                return dict(summary)
+            by_result = defaultdict(list)
+            for pk, result in _apply(batch).items():
+                by_result[result].append(pk)
+            now = timezone.now()
+            for result, pks in by_result.items():
+                PaymentNotification.objects.filter(pk__in=pks, processed_at__isnull=True).update(
+                    processed_at=now, result=result
+                )
+                summary[result] += len(pks)
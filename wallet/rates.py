@@ -0,0 +1,82 @@
+"""Time-versioned Z/UZS exchange rates with an in-memory interval index.
+
+Each worker loads the whole (small) ExchangeRate table once into two parallel
+sorted lists. ``rate_at(when)`` is then a ``bisect`` over the start times, so
+resolving the rate for thousands of rows (admin lists, statements) costs no
+queries. Like wallet.site_settings, the table's stamp (row count and newest
+``updated_at``) is re-checked at most every SITE_SETTINGS_RECHECK_SECONDS.
+Saving or deleting a rate in this process invalidates it immediately.
+"""
+import threading
+import time
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, ROUND_UP, Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import ZCOIN_RATE_UZS, ExchangeRate
+
+CENT = Decimal("0.01")
+
+_lock = threading.Lock()
+_state = {"starts": [], "rates": [], "stamp": None, "checked": None}
+
+
+def _load():
+    now = time.monotonic()
+    checked = _state["checked"]
+    if checked is not None and now - checked < getattr(settings, "SITE_SETTINGS_RECHECK_SECONDS", 5):
+        return _state
+    with _lock:
+        stamp = ExchangeRate.objects.aggregate(n=Count("id"), changed=Max("updated_at"))
+        stamp = (stamp["n"], stamp["changed"])
+        if stamp != _state["stamp"]:
+            rows = list(ExchangeRate.objects.order_by("effective_from").values_list("effective_from", "uzs_per_z"))
+            _state["starts"] = [start for start, _ in rows]
+            _state["rates"] = [rate for _, rate in rows]
+            _state["stamp"] = stamp
+        _state["checked"] = now
+    return _state
+
+
+def rate_at(when=None):
+    """UZS per Z in effect at ``when`` (default: now)."""
+    state = _load()
+    i = bisect_right(state["starts"], when or timezone.now())
+    return state["rates"][i - 1] if i else ZCOIN_RATE_UZS
+
+
+def current_rate():
+    return rate_at()
+
+
+def rates_at(moments):
+    """Rates for many datetimes with a single (cached) table load."""
+    state = _load()
+    starts, rates = state["starts"], state["rates"]
+    result = []
+    for when in moments:
+        i = bisect_right(starts, when)
+        result.append(rates[i - 1] if i else ZCOIN_RATE_UZS)
+    return result
+
+
+def uzs_to_z(uzs_amount, rate):
+    return (Decimal(uzs_amount) / rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def z_to_uzs(z_amount, rate, rounding=ROUND_HALF_UP):
+    return (Decimal(z_amount) * rate).quantize(CENT, rounding=rounding)
+
+
+def uzs_needed_for(z_amount, rate):
+    """Smallest UZS amount (in tiyin) that converts to at least ``z_amount`` Z."""
+    return z_to_uzs(z_amount, rate, rounding=ROUND_UP)
+
+
+def invalidate():
+    with _lock:
+        _state["checked"] = None
+        _state["stamp"] = None
@@ -0,0 +1,130 @@
+"""Incremental daily rollups of teacher earnings.
+
+``refresh_earnings`` reads only Transaction rows above the checkpoint's
+high-water mark, aggregates them per (teacher, part, local day) in the
+database, and folds the sums into EarningsDaily. Each batch is claimed by
+moving the checkpoint with a conditional UPDATE in the same transaction, so
+a failed run can simply be repeated and overlapping runs never fold the
+same rows twice. Dashboards query EarningsDaily and never touch the raw ledger.
+
+Earning rows are teacher-side ``course_purchase`` credits (amount_z > 0).
+Refund rows are teacher-side ``refund`` debits (amount_z < 0).
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import ledger
+from .models import EarningsDaily, RollupCheckpoint, Transaction
+
+CHECKPOINT = "earnings_daily"
+BATCH_SIZE = 50_000
+
+_EARNING = Q(type="course_purchase", amount_z__gt=0)
+_REFUND = Q(type="refund", amount_z__lt=0)
+_ZERO = Value(Decimal("0"), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+
+def _fold_batch(last_id, upto_id):
+    groups = (
+        Transaction.objects.filter(_EARNING | _REFUND, id__gt=last_id, id__lte=upto_id)
+        .annotate(day=TruncDate("created_at"))
+        .values("user_id", "course_part_id", "day")
+        .annotate(
+            revenue=Coalesce(Sum("amount_z", filter=_EARNING), _ZERO),
+            units=Count("id", filter=_EARNING),
+            refunds=Coalesce(Sum("amount_z", filter=_REFUND), _ZERO),
+            refund_units=Count("id", filter=_REFUND),
+        )
+    )
+    groups = list(groups)
+    if not groups:
+        return 0
+
+    existing = {
+        (row.teacher_id, row.part_id, row.day): row
+        for row in EarningsDaily.objects.filter(
+            teacher_id__in={g["user_id"] for g in groups},
+            day__in={g["day"] for g in groups},
+        )
+    }
+    to_create, to_update = [], []
+    for g in groups:
+        key = (g["user_id"], g["course_part_id"], g["day"])
+        row = existing.get(key)
+        if row is None:
+            row = EarningsDaily(teacher_id=key[0], part_id=key[1], day=key[2])
+            existing[key] = row
+            to_create.append(row)
+        elif row not in to_update:
+            to_update.append(row)
+        row.revenue_z += g["revenue"]
+        row.units_sold += g["units"]
+        row.refunds_z += -g["refunds"]
+        row.refund_units += g["refund_units"]
+
+    EarningsDaily.objects.bulk_create(to_create, batch_size=1000)
+    EarningsDaily.objects.bulk_update(
+        to_update, ["revenue_z", "units_sold", "refunds_z", "refund_units"], batch_size=1000
+    )
+    return len(groups)
+
+
+def refresh_earnings(batch_size=BATCH_SIZE):
+    """Fold all new ledger rows into EarningsDaily; returns the number of rows scanned up to."""
+    RollupCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    checkpoint = RollupCheckpoint.objects.filter(name=CHECKPOINT)
+    max_id = Transaction.objects.aggregate(m=Max("id"))["m"] or 0
+    folded = 0
+    last_id = checkpoint.values_list("last_id", flat=True).get()
+    while last_id < max_id:
+        upto = min(last_id + batch_size, max_id)
+        with db_transaction.atomic():
+            # Claim the batch first: an overlapping run that already moved the
+            # checkpoint makes this a no-op instead of folding the rows twice.
+            claimed = checkpoint.filter(last_id=last_id).update(last_id=upto, updated_at=timezone.now())
+            if claimed:
+                _fold_batch(last_id, upto)
+                folded += upto - last_id
+        last_id = upto if claimed else checkpoint.values_list("last_id", flat=True).get()
+    return folded
+
+
+def _in_cents(row):
+    row["revenue_z"] = ledger.money(row["revenue_z"])
+    row["refunds_z"] = ledger.money(row["refunds_z"])
+    return row
+
+
+def earnings_report(teacher, start=None, end=None):
+    """Totals plus per-day and per-part breakdowns for ``start``..``end`` (inclusive dates)."""
+    rows = EarningsDaily.objects.filter(teacher=teacher)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    sums = {
+        "revenue_z": Coalesce(Sum("revenue_z"), _ZERO),
+        "units_sold": Coalesce(Sum("units_sold"), 0),
+        "refunds_z": Coalesce(Sum("refunds_z"), _ZERO),
+        "refund_units": Coalesce(Sum("refund_units"), 0),
+    }
+    checkpoint = RollupCheckpoint.objects.filter(name=CHECKPOINT).first()
+    by_part = rows.values("part_id", "part__name", "part__course__title").annotate(**sums)
+    return {
+        "totals": _in_cents(rows.aggregate(**sums)),
+        "by_day": [_in_cents(row) for row in rows.values("day").annotate(**sums).order_by("-day")],
+        "by_part": [_in_cents(row) for row in by_part.order_by("-revenue_z")],
+        "as_of": checkpoint.updated_at if checkpoint else None,
+    }
+
+
+def parse_day(value, default=None):
+    try:
+        return datetime.date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
@@ -1,39 +1,62 @@
 from decimal import Decimal
-from .models import ZCOIN_RATE_UZS, Transaction, REFERRAL_BONUS_RATE
+
+from django.db import transaction as db_transaction
+
+from . import ledger, operations, rates
+from .models import Transaction, REFERRAL_BONUS_RATE
 
 WITHDRAW_FEE = Decimal("0.01")  # 1%
 
 def withdraw_z_to_uzs(user, z_amount):
     wallet = user.wallet
     z_amount = Decimal(z_amount)
+    if z_amount <= 0:
+        raise ValueError("Amount must be positive.")
 
-    if z_amount > wallet.balance_z:
-        raise ValueError("Not enough Z coins")
-
-    gross_uzs = z_amount * ZCOIN_RATE_UZS
+    rate = rates.current_rate()
+    gross_uzs = rates.z_to_uzs(z_amount, rate)
     fee_uzs = (gross_uzs * WITHDRAW_FEE).quantize(Decimal("0.01"))
     net_uzs = gross_uzs - fee_uzs
 
-    wallet.balance_z -= z_amount
-    wallet.save()
-
-    Transaction.objects.create(
-        user=user,
-        wallet=wallet,
-        type="withdraw",
-        amount_z=-z_amount,
-        amount_uzs=-net_uzs,
-        description=f"Withdraw {net_uzs} UZS, fee {fee_uzs}",
-    )
+    with db_transaction.atomic():
+        operations.debit(wallet, z=z_amount, message="Not enough Z coins")
+        Transaction.objects.create(
+            user=user,
+            wallet=wallet,
+            type="withdraw",
+            amount_z=-z_amount,
+            amount_uzs=-net_uzs,
+            rate_uzs=rate,
+            description=f"Withdraw {net_uzs} UZS, fee {fee_uzs}",
+        )
+        ledger.post(
+            "withdraw",
+            [
+                (ledger.wallet_code(wallet), -z_amount),
+                (ledger.EXCHANGE_Z, z_amount),
+                (ledger.EXCHANGE_UZS, -gross_uzs),
+                (ledger.EXTERNAL_UZS, net_uzs),
+                (ledger.PLATFORM_REVENUE_UZS, fee_uzs),
+            ],
+            description=f"Withdraw by {user.username}",
+        )
 
     return net_uzs, fee_uzs
 
 def handle_first_zcoin_purchase(user, z_amount):
-    if user.referred_by:
+    """Track a Z purchase in the referral stats; pay the inviter's bonus on the first one only."""
+    from accounts import referrals  # local import
+
+    with db_transaction.atomic():
+        first = referrals.record_z_purchase(user, z_amount)
+        if not (first and user.referred_by_id):
+            return
         inviter = user.referred_by
         inviter_wallet = inviter.wallet
         bonus = (z_amount * REFERRAL_BONUS_RATE).quantize(Decimal("0.01"))
-        inviter_wallet.credit_z(bonus)
+        if not bonus:
+            return
+        operations.credit(inviter_wallet, z=bonus)
         Transaction.objects.create(
             user=inviter,
             wallet=inviter_wallet,
@@ -41,3 +64,9 @@ def handle_first_zcoin_purchase(user, z_amount):
             amount_z=bonus,
             description=f"Referral bonus from {user.username}",
         )
+        ledger.post(
+            "referral_bonus",
+            [(ledger.PLATFORM_BONUSES_Z, -bonus), (ledger.wallet_code(inviter_wallet), bonus)],
+            description=f"Referral bonus from {user.username}",
+        )
+        referrals.add_bonus(inviter, bonus)
@@ -1,9 +1,23 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Wallet
+from . import rates, site_settings
+from .models import ExchangeRate, SitePaymentSettings, Wallet
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_wallet(sender, instance, created, **kwargs):
     if created:
         Wallet.objects.create(user=instance)
+
+
+@receiver(post_save, sender=SitePaymentSettings)
+@receiver(post_delete, sender=SitePaymentSettings)
+def refresh_payment_settings(sender, **kwargs):
+    # Other workers notice the new updated_at stamp on their next re-check.
+    site_settings.invalidate()
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def refresh_exchange_rates(sender, **kwargs):
+    rates.invalidate()
@@ -0,0 +1,81 @@
+"""Typed, per-process cached access to the SitePaymentSettings singleton.
+
+Each worker keeps the last loaded PaymentSettings in memory. It re-checks the
+row's ``updated_at`` stamp (one tiny indexed read) at most every
+SITE_SETTINGS_RECHECK_SECONDS, and reloads only when the stamp moved. Saving in
+the admin bumps ``updated_at`` (auto_now), so every worker picks up the change
+within that window. The saving worker itself sees it immediately (signals.py).
+"""
+import datetime
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .models import SitePaymentSettings
+
+DEFAULT_ENROLLMENT_FEE_Z = 10
+
+
+@dataclass(frozen=True)
+class PaymentSettings:
+    card_holder_name: str = ""
+    card_last4: str = ""
+    telegram_support: str = ""
+    teacher_enrollment_fee_z: int = DEFAULT_ENROLLMENT_FEE_Z
+    updated_at: datetime.datetime | None = None
+
+    @property
+    def has_card(self):
+        return bool(self.card_last4)
+
+    @classmethod
+    def from_model(cls, row):
+        if row is None:
+            return cls()
+        return cls(
+            card_holder_name=row.card_holder_name,
+            card_last4=row.card_last4,
+            telegram_support=row.telegram_support,
+            teacher_enrollment_fee_z=row.teacher_enrollment_fee_z,
+            updated_at=row.updated_at,
+        )
+
+
+_lock = threading.Lock()
+_state = {"value": None, "stamp": None, "checked": 0.0}
+
+
+def _recheck_seconds():
+    return getattr(settings, "SITE_SETTINGS_RECHECK_SECONDS", 5)
+
+
+def _singleton():
+    return SitePaymentSettings.objects.order_by("id")
+
+
+def get_payment_settings():
+    """Current PaymentSettings, from the in-process copy when it is fresh enough."""
+    now = time.monotonic()
+    value = _state["value"]
+    if value is not None and now - _state["checked"] < _recheck_seconds():
+        return value
+    with _lock:
+        stamp = _singleton().values_list("id", "updated_at").first()
+        if _state["value"] is None or stamp != _state["stamp"]:
+            _state["value"] = PaymentSettings.from_model(_singleton().first() if stamp else None)
+            _state["stamp"] = stamp
+        _state["checked"] = now
+        return _state["value"]
+
+
+def teacher_enrollment_fee():
+    return get_payment_settings().teacher_enrollment_fee_z
+
+
+def invalidate():
+    """Drop this process's copy; the next read reloads it."""
+    with _lock:
+        _state["value"] = None
+        _state["stamp"] = None
@@ -0,0 +1,84 @@
+"""Wallet statements: filtered, keyset-paginated Transaction history and CSV export.
+
+Rows are always ordered newest first by ``(created_at, id)`` and paged with
+courses.pagination cursors, which the ``tx_wallet_created_idx`` index serves as a
+range scan however far back a statement goes.
+"""
+import csv
+import datetime
+
+from django.utils import timezone
+
+from courses.pagination import older_than
+
+from . import rates
+from .models import TRANSACTION_TYPES, Transaction
+from .rollups import parse_day
+
+STATEMENT_PAGE_SIZE = 50
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_HEADER = ["id", "created_at", "type", "amount_z", "amount_uzs", "rate_uzs", "description"]
+RATED_TYPES = {"convert_to_z", "withdraw"}
+_TYPES = dict(TRANSACTION_TYPES)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def statement_filters(params):
+    """Normalise ``from``/``to``/``type`` query parameters; unknown values are dropped."""
+    tx_type = params.get("type") or ""
+    return {
+        "from": parse_day(params.get("from")),
+        "to": parse_day(params.get("to")),
+        "type": tx_type if tx_type in _TYPES else "",
+    }
+
+
+def statement_queryset(wallet, filters):
+    rows = Transaction.objects.filter(wallet=wallet)
+    if filters["from"]:
+        rows = rows.filter(created_at__gte=_day_start(filters["from"]))
+    if filters["to"]:
+        rows = rows.filter(created_at__lt=_day_start(filters["to"] + datetime.timedelta(days=1)))
+    if filters["type"]:
+        rows = rows.filter(type=filters["type"])
+    return rows.order_by("-created_at", "-id")
+
+
+def iter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield rows of a ``(-created_at, -id)`` ordered queryset one keyset chunk at a time.
+
+    Only ``chunk_size`` rows are held in memory, and each chunk is its own short query.
+    """
+    cursor = None
+    while True:
+        page = queryset.filter(older_than(*cursor)) if cursor else queryset
+        chunk = list(
+            page.values_list("id", "created_at", "type", "amount_z", "amount_uzs", "rate_uzs", "description")[:chunk_size]
+        )
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        cursor = (chunk[-1][1], chunk[-1][0])
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for pk, created_at, tx_type, amount_z, amount_uzs, rate, description in iter_chunks(queryset):
+        if rate is None and tx_type in RATED_TYPES:
+            # Rows from before rates were recorded: resolve in memory, no query per row.
+            rate = rates.rate_at(created_at)
+        yield writer.writerow(
+            [pk, timezone.localtime(created_at).isoformat(), tx_type, amount_z, amount_uzs, rate or "", description or ""]
+        )
@@ -5,7 +5,10 @@ app_name = "wallet"
 
 urlpatterns = [
     path("", views.wallet_view, name="wallet"),
+    path("statement/", views.statement, name="statement"),
+    path("statement.csv", views.statement_csv, name="statement_csv"),
     path("teacher-enroll/", views.teacher_enroll, name="teacher_enroll"),
     path("pay/<int:order_id>/", views.payment_simulate, name="payment_simulate"),
     path("pay/<int:order_id>/success/", views.payment_success, name="payment_success"),
+    path("webhooks/<str:provider>/", views.payment_webhook, name="payment_webhook"),
 ]
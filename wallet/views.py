@@ -1,12 +1,26 @@
+import json
 from decimal import Decimal
 
 from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction as db_transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.http import urlencode
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-from .models import Wallet, Transaction, PaymentOrder, SitePaymentSettings
+from courses.pagination import InvalidCursor, decode_cursor, keyset_page, older_than
+
+from . import ledger, payments, rates, statements
+from .models import TRANSACTION_TYPES, Wallet, Transaction, PaymentOrder
+from .operations import InsufficientFunds, balance_with_pending, debit
 from .services import withdraw_z_to_uzs, handle_first_zcoin_purchase
+from .site_settings import get_payment_settings, teacher_enrollment_fee
+
+User = get_user_model()
 
 
 def _tx_amount_kwargs(*, z=None, uzs=None):
@@ -44,10 +58,7 @@ def teacher_enroll(request):
     if not request.user.is_authenticated or getattr(request.user, "role", "") != "teacher":
         return redirect("accounts:login")
 
-    fee = 10
-    pay_settings = SitePaymentSettings.objects.first()
-    if pay_settings and getattr(pay_settings, "teacher_enroll_fee_z", None):
-        fee = int(pay_settings.teacher_enroll_fee_z)
+    fee = teacher_enrollment_fee()
 
     wallet, _ = Wallet.objects.get_or_create(user=request.user)
 
@@ -56,23 +67,29 @@ def teacher_enroll(request):
             messages.info(request, "You are already enrolled.")
             return redirect("dashboard")
 
-        if wallet.z_balance < fee:
+        try:
+            with db_transaction.atomic():
+                # Flip the flag first so a double-submit cannot charge the fee twice.
+                if not User.objects.filter(pk=request.user.pk, teacher_enrolled=False).update(teacher_enrolled=True):
+                    messages.info(request, "You are already enrolled.")
+                    return redirect("dashboard")
+                debit(wallet, z=fee)
+                Transaction.objects.create(
+                    user=request.user,
+                    wallet=wallet,
+                    type="purchase",
+                    description="Teacher enrollment fee",
+                    **_tx_amount_kwargs(z=-fee),
+                )
+                ledger.post(
+                    "teacher_enrollment",
+                    [(ledger.wallet_code(wallet), -fee), (ledger.PLATFORM_REVENUE_Z, fee)],
+                    description=f"Teacher enrollment fee from {request.user.username}",
+                )
+        except InsufficientFunds:
             messages.error(request, f"Not enough Z coins. You need {fee} Z coins.")
             return redirect("wallet:wallet")
-
-        wallet.z_balance -= fee
-        wallet.save(update_fields=["z_balance"])
-
-        Transaction.objects.create(
-            user=request.user,
-            wallet=wallet,
-            type="purchase",
-            description="Teacher enrollment fee",
-            **_tx_amount_kwargs(z=-fee),
-        )
-
         request.user.teacher_enrolled = True
-        request.user.save(update_fields=["teacher_enrolled"])
 
         messages.success(request, "Teacher enrollment completed. You can now create courses.")
         return redirect("courses:course_list")
@@ -91,7 +108,7 @@ def wallet_view(request):
         # Fallback if related_name differs or not set
         transactions = Transaction.objects.filter(wallet=wallet).order_by("-created_at")[:50]
 
-    pay_settings = SitePaymentSettings.objects.first()
+    pay_settings = get_payment_settings()
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -101,14 +118,20 @@ def wallet_view(request):
             if amount <= 0:
                 messages.error(request, "Amount must be positive.")
             else:
-                wallet.deposit_uzs(amount)
-                Transaction.objects.create(
-                    user=request.user,
-                    wallet=wallet,
-                    type="deposit",
-                    description="Manual deposit (simulate HUMO/Uzcard/Visa)",
-                    **_tx_amount_kwargs(uzs=amount),
-                )
+                with db_transaction.atomic():
+                    wallet.deposit_uzs(amount)
+                    Transaction.objects.create(
+                        user=request.user,
+                        wallet=wallet,
+                        type="deposit",
+                        description="Manual deposit (simulate HUMO/Uzcard/Visa)",
+                        **_tx_amount_kwargs(uzs=amount),
+                    )
+                    ledger.post(
+                        "deposit",
+                        [(ledger.EXTERNAL_UZS, -amount), (ledger.wallet_code(wallet, ledger.UZS), amount)],
+                        description="Manual deposit",
+                    )
                 messages.success(request, "Balance topped up (simulation).")
             return redirect("wallet:wallet")
 
@@ -152,18 +175,22 @@ def wallet_view(request):
         if action == "convert":
             uzs_amount = Decimal(request.POST.get("convert_uzs", "0") or "0")
             try:
-                z = wallet.convert_uzs_to_z(uzs_amount)
+                rate = rates.current_rate()
+                with db_transaction.atomic():
+                    z = wallet.convert_uzs_to_z(uzs_amount, rate=rate)
+                    Transaction.objects.create(
+                        user=request.user,
+                        wallet=wallet,
+                        type="convert_to_z",
+                        description="Converted to Z coins",
+                        rate_uzs=rate,
+                        **_tx_amount_kwargs(uzs=-uzs_amount, z=z),
+                    )
+                    ledger.post("convert_to_z", ledger.conversion_lines(wallet, uzs_amount, z))
+                    handle_first_zcoin_purchase(request.user, z)
             except ValueError as e:
                 messages.error(request, str(e))
             else:
-                Transaction.objects.create(
-                    user=request.user,
-                    wallet=wallet,
-                    type="convert_to_z",
-                    description="Converted to Z coins",
-                    **_tx_amount_kwargs(uzs=-uzs_amount, z=z),
-                )
-                handle_first_zcoin_purchase(request.user, z)
                 messages.success(request, f"Converted to {z} Z.")
             return redirect("wallet:wallet")
 
@@ -184,6 +211,8 @@ def wallet_view(request):
             "wallet": wallet,
             "transactions": transactions,
             "pay_settings": pay_settings,
+            "pending_z": balance_with_pending(wallet)[1],
+            "zcoin_rate": rates.current_rate(),
         },
     )
 
@@ -200,22 +229,56 @@ def payment_simulate(request, order_id):
 def payment_success(request, order_id):
     order = get_object_or_404(PaymentOrder, id=order_id, user=request.user)
 
-    if order.status != "paid":
-        order.status = "paid"
-        order.paid_at = timezone.now()
-        order.save(update_fields=["status", "paid_at"])
+    # The conditional created -> paid UPDATE makes double clicks credit only once.
+    if payments.complete_order(order):
+        messages.success(request, "Payment successful! Your wallet was topped up.")
 
-        wallet, _ = Wallet.objects.get_or_create(user=request.user)
-        wallet.deposit_uzs(order.amount_uzs)
+    return redirect("wallet:wallet")
 
-        Transaction.objects.create(
-            user=request.user,
-            wallet=wallet,
-            type="deposit",
-            description=f"Top up via {order.get_provider_display()} (simulation)",
-            **_tx_amount_kwargs(uzs=order.amount_uzs),
-        )
 
-        messages.success(request, "Payment successful! Your wallet was topped up.")
+@login_required
+def statement(request):
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    filters = statements.statement_filters(request.GET)
+    rows = statements.statement_queryset(wallet, filters)
+    try:
+        cursor = decode_cursor(request.GET["cursor"]) if request.GET.get("cursor") else None
+    except InvalidCursor:
+        cursor = None
+    if cursor:
+        rows = rows.filter(older_than(*cursor))
+    page, next_cursor = keyset_page(rows, statements.STATEMENT_PAGE_SIZE)
+
+    query = {k: v for k, v in (("from", request.GET.get("from")), ("to", request.GET.get("to")), ("type", filters["type"])) if v}
+    return render(request, "wallet/statement.html", {
+        "wallet": wallet,
+        "transactions": page,
+        "filters": filters,
+        "types": TRANSACTION_TYPES,
+        "filter_query": urlencode(query),
+        "next_query": urlencode({**query, "cursor": next_cursor}) if next_cursor else "",
+    })
 
-    return redirect("wallet:wallet")
+
+@login_required
+def statement_csv(request):
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    rows = statements.statement_queryset(wallet, statements.statement_filters(request.GET))
+    response = StreamingHttpResponse(statements.csv_lines(rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="nok-statement-{timezone.localdate():%Y%m%d}.csv"'
+    return response
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request, provider):
+    """Provider callback endpoint: verify, store in the inbox, acknowledge."""
+    if provider not in payments.PROVIDERS:
+        raise Http404
+    if not payments.verify_signature(request.body, request.META.get(payments.SIGNATURE_HEADER)):
+        return JsonResponse({"error": "Invalid signature."}, status=403)
+    try:
+        notification, created = payments.ingest(provider, json.loads(request.body))
+    except (ValueError, payments.InvalidNotification) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"ok": True, "id": notification.pk, "duplicate": not created})